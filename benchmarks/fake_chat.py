@@ -0,0 +1,95 @@
+import json
+import random
+
+
+class FakeAuthor:
+    """
+    Stand-in for a TwitchIO chatter with the attributes the command handlers use.
+    """
+    def __init__(self, name, sub_tier=0, is_mod=False):
+        self.name = name
+        self.is_subscriber = sub_tier > 0
+        self.is_mod = is_mod
+        self.badges = {"subscriber": str(sub_tier * 1000)} if sub_tier else {}
+
+
+class FakeChannel:
+    """
+    Stand-in for a TwitchIO channel. Counts the messages instead of sending them.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.sent = 0
+
+    async def send(self, text):
+        self.sent += 1
+
+
+class FakeContext:
+    """
+    Stand-in for a TwitchIO command context.
+    """
+    def __init__(self, channel, author):
+        self.channel = channel
+        self.author = author
+
+
+class FakeTokenManager:
+    """
+    Token manager without a token, so the bot never talks to Twitch.
+    """
+    login = None
+    user_id = None
+
+    def add_listener(self, callback):
+        pass
+
+
+# Share of viewers per subscriber tier
+SUB_TIER_WEIGHTS = {0: 0.7, 1: 0.2, 2: 0.07, 3: 0.03}
+
+# Share of each command in a normal chat
+COMMAND_MIX = {"join": 0.5, "leave": 0.15, "queue": 0.2, "position": 0.15}
+
+
+def random_sub_tier(rng):
+    return rng.choices(list(SUB_TIER_WEIGHTS), weights=list(SUB_TIER_WEIGHTS.values()))[0]
+
+
+def generate_stream(count, rate, viewers, seed=0, raid_at=None, raid_size=0):
+    """
+    Generates a synthetic chat stream as a list of {"t", "command", "user", "sub_tier"} dicts.
+    rate: commands per second, 0 sends everything at once.
+    viewers: number of distinct chatters.
+    raid_at / raid_size: index in the stream where raid_size new viewers send !join at the same time.
+    """
+    rng = random.Random(seed)
+    tiers = {}
+    stream = []
+    for index in range(count):
+        t = index / rate if rate else 0.0
+        if index == raid_at:
+            for raider in range(raid_size):
+                stream.append({"t": t, "command": "join", "user": f"raider{raider}", "sub_tier": 0})
+        user = f"viewer{rng.randrange(viewers)}"
+        tier = tiers.setdefault(user, random_sub_tier(rng))
+        command = rng.choices(list(COMMAND_MIX), weights=list(COMMAND_MIX.values()))[0]
+        stream.append({"t": t, "command": command, "user": user, "sub_tier": tier})
+    return stream
+
+
+def save_stream(stream, path):
+    """
+    Writes a chat stream as JSON lines, the format read by load_stream.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for message in stream:
+            f.write(json.dumps(message) + "\n")
+
+
+def load_stream(path):
+    """
+    Reads a recorded chat stream from JSON lines with "t", "command", "user" and optionally "sub_tier".
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
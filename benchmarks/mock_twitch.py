@@ -0,0 +1,377 @@
+"""
+Local stand-in for the Twitch IRC, OAuth and Helix endpoints, for offline load and soak tests.
+
+Speaks enough IRC over WebSocket (with tags and badges) for TwitchIO to log in and join
+channels, then simulates chatters in every joined channel. Tokens expire after
+--token-lifetime seconds, so long runs also exercise validation and token refresh.
+
+Usage:
+    python -m benchmarks.mock_twitch --chatters 5000 --rate 200
+
+Then point the bot at it in config.json:
+    "twitch_id_base_url": "http://127.0.0.1:8790",
+    "twitch_api_base_url": "http://127.0.0.1:8790",
+    "twitch_irc_url": "ws://127.0.0.1:8790/irc",
+    "twitch_channel": "mockchannel",
+and set twitch_client_id, twitch_oauth_token and twitch_refresh_token to any value.
+The first validation fails and the bot gets a mock token with the refresh token.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+import uuid
+
+from aiohttp import web, WSMsgType
+
+from benchmarks.fake_chat import COMMAND_MIX, random_sub_tier
+
+
+class MockTwitch:
+    """
+    Mock Twitch server. All endpoints share one port:
+    - /oauth2/authorize, /oauth2/token, /oauth2/validate
+    - /helix/users
+    - /irc (IRC over WebSocket)
+
+    Access tokens have the form mock.<login>.<expiry>.<nonce>, so they stay valid
+    across restarts of the mock server. Any refresh token is accepted.
+    """
+    # Seconds between two batches of simulated chat messages
+    TICK = 0.05
+    # Seconds between two printed stats lines
+    STATS_INTERVAL = 10
+
+    def __init__(self, host="127.0.0.1", port=8790, login="mockbot", user_id="1000",
+                 token_lifetime=3600, chatters=1000, rate=100, command_share=0.5,
+                 raid_interval=0, raid_size=0, bot_mod=False, reconnect_interval=0, seed=0):
+        """
+        chatters: number of distinct simulated viewers per channel.
+        rate: chat messages per second per channel.
+        command_share: share of the messages that are bot commands.
+        raid_interval / raid_size: every raid_interval seconds, raid_size new viewers send !join at once.
+        reconnect_interval: seconds between RECONNECT messages, like Twitch sends before server restarts.
+        """
+        self.host = host
+        self.port = port
+        self.login = login
+        self.user_id = user_id
+        self.token_lifetime = token_lifetime
+        self.chatters = chatters
+        self.rate = rate
+        self.command_share = command_share
+        self.raid_interval = raid_interval
+        self.raid_size = raid_size
+        self.bot_mod = bot_mod
+        self.reconnect_interval = reconnect_interval
+        self.seed = seed
+
+        self.stats = {"chat_sent": 0, "bot_messages": 0, "logins": 0, "failed_logins": 0,
+                      "token_refreshes": 0, "validations": 0}
+        self._connections = set()
+        self._message_ids = itertools.count()
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_get("/oauth2/authorize", self._handle_authorize)
+        self.app.router.add_post("/oauth2/token", self._handle_token)
+        self.app.router.add_get("/oauth2/validate", self._handle_validate)
+        self.app.router.add_get("/helix/users", self._handle_users)
+        self.app.router.add_get("/irc", self._handle_irc)
+        self.app.on_shutdown.append(self._on_shutdown)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"Mock Twitch running on http://{self.host}:{self.port}, IRC on ws://{self.host}:{self.port}/irc")
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # Tokens
+
+    def issue_token(self):
+        expires_at = int(time.time() + self.token_lifetime)
+        return f"mock.{self.login}.{expires_at}.{uuid.uuid4().hex[:8]}"
+
+    def token_expires_in(self, token):
+        """
+        Returns the seconds until a token expires, or None if it is invalid or expired.
+        """
+        parts = (token or "").split(".")
+        if len(parts) != 4 or parts[0] != "mock" or not parts[2].isdigit():
+            return None
+        expires_in = int(parts[2]) - int(time.time())
+        return expires_in if expires_in > 0 else None
+
+    # OAuth and Helix
+
+    async def _handle_authorize(self, request):
+        redirect_uri = request.query.get("redirect_uri", "http://localhost:8080")
+        raise web.HTTPFound(f"{redirect_uri}?code=mockcode&scope={request.query.get('scope', '')}")
+
+    async def _handle_token(self, request):
+        data = await request.post()
+        if data.get("grant_type") not in ("authorization_code", "refresh_token"):
+            return web.json_response({"status": 400, "message": "invalid grant type"}, status=400)
+        if data.get("grant_type") == "refresh_token":
+            self.stats["token_refreshes"] += 1
+        return web.json_response({
+            "access_token": self.issue_token(),
+            "refresh_token": f"mockrefresh.{uuid.uuid4().hex[:8]}",
+            "expires_in": self.token_lifetime,
+            "scope": ["chat:read", "chat:edit"],
+            "token_type": "bearer",
+        })
+
+    async def _handle_validate(self, request):
+        self.stats["validations"] += 1
+        token = request.headers.get("Authorization", "").partition(" ")[2]
+        expires_in = self.token_expires_in(token)
+        if expires_in is None:
+            return web.json_response({"status": 401, "message": "invalid access token"}, status=401)
+        return web.json_response({
+            "client_id": "mock",
+            "login": self.login,
+            "scopes": ["chat:read", "chat:edit"],
+            "user_id": self.user_id,
+            "expires_in": expires_in,
+        })
+
+    async def _handle_users(self, request):
+        token = request.headers.get("Authorization", "").partition(" ")[2]
+        if self.token_expires_in(token) is None:
+            return web.json_response({"status": 401, "message": "invalid access token"}, status=401)
+        logins = request.query.getall("login", [self.login])
+        return web.json_response({"data": [{
+            "id": self.user_id if login == self.login else str(abs(hash(login)) % 10 ** 9),
+            "login": login,
+            "display_name": login,
+            "type": "",
+            "broadcaster_type": "",
+        } for login in logins]})
+
+    # IRC
+
+    async def _handle_irc(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connection = _IRCConnection(self, ws)
+        self._connections.add(connection)
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                for line in message.data.split("\r\n"):
+                    if line.strip():
+                        await connection.handle(line.strip())
+        finally:
+            self._connections.discard(connection)
+            connection.stop()
+        return ws
+
+    async def _on_shutdown(self, app):
+        for connection in list(self._connections):
+            connection.stop()
+            await connection.ws.close()
+
+    def chat_line(self, channel, username, sub_tier, text):
+        """
+        Returns a PRIVMSG line with the tags Twitch sends.
+        Tier 1 badges carry the months, higher tiers start at 2000 and 3000 like on Twitch.
+        """
+        months = 6
+        if sub_tier:
+            badge = f"subscriber/{sub_tier * 1000 + months if sub_tier > 1 else months}"
+            badge_info = f"subscriber/{months}"
+        else:
+            badge = badge_info = ""
+        return (
+            f"@badge-info={badge_info};badges={badge};color=;display-name={username};emotes=;"
+            f"first-msg=0;flags=;id={next(self._message_ids):032x};mod=0;returning-chatter=0;"
+            f"room-id=1;subscriber={1 if sub_tier else 0};tmi-sent-ts={int(time.time() * 1000)};"
+            f"turbo=0;user-id={abs(hash(username)) % 10 ** 9};user-type= "
+            f":{username}!{username}@{username}.tmi.twitch.tv PRIVMSG #{channel} :{text}"
+        )
+
+    async def print_stats(self):
+        previous = dict(self.stats)
+        while True:
+            await asyncio.sleep(self.STATS_INTERVAL)
+            current = dict(self.stats)
+            chat_rate = (current["chat_sent"] - previous["chat_sent"]) / self.STATS_INTERVAL
+            reply_rate = (current["bot_messages"] - previous["bot_messages"]) / self.STATS_INTERVAL
+            print(f"connections: {len(self._connections)}, chat: {chat_rate:.0f} msg/s, "
+                  f"bot: {reply_rate:.1f} msg/s, logins: {current['logins']} "
+                  f"({current['failed_logins']} failed), refreshes: {current['token_refreshes']}")
+            previous = current
+
+
+class _IRCConnection:
+    """
+    One IRC client connection of the mock server.
+    """
+    def __init__(self, server, ws):
+        self.server = server
+        self.ws = ws
+        self.token = None
+        self.nick = None
+        # Chat simulation task per joined channel
+        self._channels = {}
+        self._reconnect_task = None
+
+    async def send(self, *lines):
+        if not self.ws.closed:
+            await self.ws.send_str("\r\n".join(lines) + "\r\n")
+
+    async def handle(self, line):
+        command, _, rest = line.partition(" ")
+        if command == "PASS":
+            self.token = rest.removeprefix("oauth:")
+        elif command == "NICK":
+            await self._login(rest)
+        elif command == "CAP":
+            await self.send(f":tmi.twitch.tv CAP * ACK :{rest.partition(':')[2]}")
+        elif command == "JOIN":
+            for channel in rest.split(","):
+                await self._join(channel.strip().lstrip("#").lower())
+        elif command == "PART":
+            channel = rest.strip().lstrip("#").lower()
+            task = self._channels.pop(channel, None)
+            if task:
+                task.cancel()
+            await self.send(f":{self.nick}!{self.nick}@{self.nick}.tmi.twitch.tv PART #{channel}")
+        elif command == "PRIVMSG":
+            self.server.stats["bot_messages"] += 1
+        elif command == "PING":
+            await self.send(f":tmi.twitch.tv PONG tmi.twitch.tv :{rest.lstrip(':')}")
+
+    def stop(self):
+        for task in self._channels.values():
+            task.cancel()
+        self._channels.clear()
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+
+    async def _login(self, nick):
+        if self.server.token_expires_in(self.token) is None:
+            self.server.stats["failed_logins"] += 1
+            await self.send(":tmi.twitch.tv NOTICE * :Login unsuccessful")
+            await self.ws.close()
+            return
+        self.server.stats["logins"] += 1
+        self.nick = nick.strip().lower()
+        await self.send(*[
+            f":tmi.twitch.tv {code:03d} {self.nick} :{text}" for code, text in (
+                (1, "Welcome, GLHF!"), (2, "Your host is tmi.twitch.tv"), (3, "This server is rather new"),
+                (4, "-"), (375, "-"), (372, "You are in a maze of twisty passages, all alike."), (376, ">"),
+            )
+        ])
+        if self.server.reconnect_interval:
+            self._reconnect_task = asyncio.create_task(self._send_reconnect())
+
+    async def _join(self, channel):
+        nick = self.nick
+        mod = 1 if self.server.bot_mod else 0
+        badges = "moderator/1" if mod else ""
+        await self.send(
+            f":{nick}!{nick}@{nick}.tmi.twitch.tv JOIN #{channel}",
+            f":{nick}.tmi.twitch.tv 353 {nick} = #{channel} :{nick}",
+            f":{nick}.tmi.twitch.tv 366 {nick} #{channel} :End of /NAMES list",
+            f"@badge-info=;badges={badges};color=;display-name={nick};emote-sets=0;mod={mod};"
+            f"subscriber=0;user-type= :tmi.twitch.tv USERSTATE #{channel}",
+            f"@emote-only=0;followers-only=-1;r9k=0;room-id=1;slow=0;subs-only=0 :tmi.twitch.tv ROOMSTATE #{channel}",
+        )
+        if channel not in self._channels:
+            self._channels[channel] = asyncio.create_task(self._simulate_chat(channel))
+
+    async def _simulate_chat(self, channel):
+        """
+        Sends chat messages of random viewers at the configured rate, batched per tick
+        like Twitch batches lines into one WebSocket frame.
+        """
+        server = self.server
+        rng = random.Random(f"{server.seed}-{channel}")
+        commands = list(COMMAND_MIX)
+        weights = list(COMMAND_MIX.values())
+        tiers = {}
+        raiders = itertools.count()
+        budget = 0.0
+        last = time.monotonic()
+        next_raid = last + server.raid_interval if server.raid_interval else float("inf")
+
+        while not self.ws.closed:
+            await asyncio.sleep(server.TICK)
+            now = time.monotonic()
+            budget += server.rate * (now - last)
+            last = now
+            lines = []
+            for _ in range(int(budget)):
+                username = f"viewer{rng.randrange(server.chatters)}"
+                sub_tier = tiers.get(username)
+                if sub_tier is None:
+                    sub_tier = tiers[username] = random_sub_tier(rng)
+                if rng.random() < server.command_share:
+                    text = "!" + rng.choices(commands, weights=weights)[0]
+                else:
+                    text = "hello chat"
+                lines.append(server.chat_line(channel, username, sub_tier, text))
+            budget -= int(budget)
+            if now >= next_raid:
+                next_raid += server.raid_interval
+                for _ in range(server.raid_size):
+                    lines.append(server.chat_line(channel, f"raider{next(raiders)}", 0, "!join"))
+            if lines:
+                server.stats["chat_sent"] += len(lines)
+                await self.send(*lines)
+
+    async def _send_reconnect(self):
+        await asyncio.sleep(self.server.reconnect_interval)
+        await self.send(":tmi.twitch.tv RECONNECT")
+        await asyncio.sleep(1)
+        await self.ws.close()
+
+
+async def _serve(server):
+    await server.start()
+    try:
+        await server.print_stats()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Twitch IRC, OAuth and Helix endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--login", default="mockbot", help="login of the bot account")
+    parser.add_argument("--token-lifetime", type=int, default=3600, help="seconds until access tokens expire")
+    parser.add_argument("--chatters", type=int, default=1000, help="distinct viewers per channel")
+    parser.add_argument("--rate", type=float, default=100, help="chat messages per second per channel")
+    parser.add_argument("--command-share", type=float, default=0.5, help="share of messages that are commands")
+    parser.add_argument("--raid-interval", type=float, default=0, help="seconds between raids, 0 = no raids")
+    parser.add_argument("--raid-size", type=int, default=500)
+    parser.add_argument("--bot-mod", action="store_true", help="the bot is a moderator in all channels")
+    parser.add_argument("--reconnect-interval", type=float, default=0,
+                        help="seconds between RECONNECT messages, 0 = never")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockTwitch(
+        args.host, args.port, args.login, token_lifetime=args.token_lifetime,
+        chatters=args.chatters, rate=args.rate, command_share=args.command_share,
+        raid_interval=args.raid_interval, raid_size=args.raid_size, bot_mod=args.bot_mod,
+        reconnect_interval=args.reconnect_interval, seed=args.seed,
+    )
+    try:
+        asyncio.run(_serve(server))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Benchmarks for the queue engine, the chat command handlers and the UI refresh.
+
+Chat streams are replayed through the real command handlers with fake contexts,
+so no network or Twitch account is needed.
+
+Usage:
+    python -m benchmarks.run                         run all benchmarks
+    python -m benchmarks.run --sizes 1000 10000      queue sizes to test
+    python -m benchmarks.run --rate 500              commands per second for the chat replay (0 = unthrottled)
+    python -m benchmarks.run --replay chat.jsonl     replay a recorded chat stream
+    python -m benchmarks.run --write-stream chat.jsonl
+                                                     save the synthetic chat stream for later replays
+    python -m benchmarks.run --save-baseline NAME    save the results as benchmarks/baselines/NAME.json
+    python -m benchmarks.run --compare NAME          compare with a saved baseline, exit code 1 on regressions
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_chat import (
+    FakeAuthor, FakeChannel, FakeContext, FakeTokenManager,
+    generate_stream, load_stream, save_stream, random_sub_tier,
+)
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+# A metric is a regression if it got worse by more than this fraction
+REGRESSION_TOLERANCE = 0.25
+# Percentiles of fewer samples are too noisy to compare
+MIN_SAMPLES = 50
+CHANNEL = "benchmark"
+
+
+class Results:
+    """
+    Collected metrics: name -> (value, unit, "lower" or "higher" is better).
+    """
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.metrics[name] = {"value": value, "unit": unit, "better": better}
+        print(f"  {name:<45} {value:>14.3f} {unit}")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def make_config(data_dir=None):
+    """
+    Returns a config with the default settings that never reads or writes config.json,
+    so results don't depend on the local setup. data_dir replaces the config directory.
+    """
+    from bot.config import Config
+
+    class BenchmarkConfig(Config):
+        def load_config(self):
+            return {}
+
+        def save_config(self):
+            pass
+
+        def get_data_dir(self):
+            return data_dir
+
+    config = BenchmarkConfig()
+    config.sorting_option = 0
+    config.restore_queue = False
+    return config
+
+
+def make_shard(config, data_dir):
+    from bot.channel_shard import ChannelShard
+    from bot.headless_controller import HeadlessController
+
+    shard = ChannelShard(CHANNEL, config, data_dir)
+    shard.restore()
+    shard.controller = HeadlessController(shard.queue_manager, shard.history, CHANNEL)
+    return shard
+
+
+def fill(queue_manager, size, rng):
+    users = [(f"filler{i}", random_sub_tier(rng), rng.randrange(10), 1_700_000_000 + i) for i in range(size)]
+    queue_manager.add_users(users)
+
+
+# Queue engine
+
+def bench_queue_manager(results, size, ops=1000):
+    from bot.queue_manager import QueueManager
+
+    rng = random.Random(size)
+    config = make_config()
+    queue_manager = QueueManager(config)
+    fill(queue_manager, size, rng)
+    names = [f"filler{rng.randrange(size)}" for _ in range(ops)]
+    prefix = f"queue_manager.{size}"
+
+    start = time.perf_counter()
+    for i in range(ops):
+        queue_manager.add_user(f"new{i}", random_sub_tier(rng), rng.randrange(10), time.time())
+    results.add(f"{prefix}.add_user", (time.perf_counter() - start) / ops * 1e6, "us/op")
+
+    start = time.perf_counter()
+    for i in range(ops):
+        queue_manager.remove_from_queue(f"new{i}")
+    results.add(f"{prefix}.remove_from_queue", (time.perf_counter() - start) / ops * 1e6, "us/op")
+
+    start = time.perf_counter()
+    for name in names:
+        queue_manager.update_times_queued(name, rng.randrange(10))
+    results.add(f"{prefix}.update_times_queued", (time.perf_counter() - start) / ops * 1e6, "us/op")
+
+    start = time.perf_counter()
+    for name in names:
+        queue_manager.rank_of(name)
+    results.add(f"{prefix}.rank_of", (time.perf_counter() - start) / ops * 1e6, "us/op")
+
+    start = time.perf_counter()
+    for name in names[:100]:
+        if queue_manager.move_to_selected(name):
+            queue_manager.move_back_to_queue(name)
+    results.add(f"{prefix}.select_and_back", (time.perf_counter() - start) / 100 * 1e6, "us/op")
+
+    start = time.perf_counter()
+    for option in (1, 2, 3, 0):
+        config.sorting_option = option
+        queue_manager.sort_queue()
+    results.add(f"{prefix}.sort_queue", (time.perf_counter() - start) / 4 * 1e3, "ms/op")
+
+    start = time.perf_counter()
+    users = [(f"bulk{i}", random_sub_tier(rng), rng.randrange(10), time.time()) for i in range(ops)]
+    queue_manager.add_users(users)
+    results.add(f"{prefix}.add_users_1000", (time.perf_counter() - start) * 1e3, "ms")
+
+
+def bench_memory(results, size):
+    from bot.queue_manager import QueueManager
+
+    rng = random.Random(size)
+    queue_manager = QueueManager(make_config())
+    # Names are created up front, chat messages bring them anyway
+    users = [(f"filler{i}", random_sub_tier(rng), rng.randrange(10), 1_700_000_000 + i) for i in range(size)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    queue_manager.add_users(users)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    results.add(f"memory.{size}.bytes_per_entry", (after - before) / size, "B")
+
+
+# Chat command handlers
+
+async def replay(bot, shard, stream, rate):
+    """
+    Sends a chat stream through the command handlers.
+    Returns (latencies per command, join visibility latencies, elapsed seconds).
+    """
+    from bot.queue_event import QueueEvent
+
+    handlers = {
+        "join": bot.join_queue, "leave": bot.leave_queue,
+        "queue": bot.print_queue, "position": bot.print_position,
+    }
+    channel = FakeChannel(CHANNEL)
+    authors = {}
+    latencies = {command: [] for command in handlers}
+
+    # Time from !join to the user showing up in the queue
+    submitted = {}
+    visible = []
+
+    def on_event(event):
+        started = submitted.pop(event.entry.username, None) if event.kind == QueueEvent.INSERTED else None
+        if started is not None:
+            visible.append(time.perf_counter() - started)
+
+    shard.queue_manager.add_listener(on_event)
+    start = time.perf_counter()
+    for message in stream:
+        if rate:
+            delay = start + message["t"] - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        user = message["user"]
+        author = authors.get(user)
+        if author is None:
+            author = authors[user] = FakeAuthor(user, message.get("sub_tier", 0))
+        ctx = FakeContext(channel, author)
+        command = message["command"]
+        began = time.perf_counter()
+        if command == "join":
+            submitted.setdefault(user, began)
+        await handlers[command]._callback(bot, ctx)
+        latencies[command].append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+
+    # Let the last join batch through
+    await asyncio.sleep(bot.join_ingest.max_latency * 2)
+    shard.queue_manager.remove_listener(on_event)
+    return latencies, visible, elapsed
+
+
+def bench_commands(results, size, stream, rate, name):
+    from bot.bot_twitch import TwitchBot
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        config = make_config(data_dir)
+        shard = make_shard(config, data_dir)
+        fill(shard.queue_manager, size, random.Random(size))
+
+        async def run():
+            bot = TwitchBot({CHANNEL: shard}, config, FakeTokenManager())
+            try:
+                return await replay(bot, shard, stream, rate)
+            finally:
+                await bot.chat.close()
+
+        latencies, visible, elapsed = asyncio.run(run())
+        shard.close()
+
+    prefix = f"commands.{name}.{size}"
+    total = sum(len(values) for values in latencies.values())
+    results.add(f"{prefix}.throughput", total / elapsed, "cmd/s", better="higher")
+    for command, values in latencies.items():
+        if len(values) >= MIN_SAMPLES:
+            results.add(f"{prefix}.{command}.p50", percentile(values, 0.5) * 1e6, "us")
+            results.add(f"{prefix}.{command}.p99", percentile(values, 0.99) * 1e6, "us")
+    if len(visible) >= MIN_SAMPLES:
+        results.add(f"{prefix}.join_visible.p50", percentile(visible, 0.5) * 1e3, "ms")
+        results.add(f"{prefix}.join_visible.p99", percentile(visible, 0.99) * 1e3, "ms")
+
+
+# UI
+
+def bench_ui(results, size):
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        print("  PyQt6 is not installed, skipping the UI benchmark")
+        return
+    from ui.controller import QueueController
+    from ui.ui import UI
+
+    app = QApplication.instance() or QApplication([])
+    with tempfile.TemporaryDirectory() as data_dir:
+        config = make_config(data_dir)
+        shard = make_shard(config, data_dir)
+        shard.controller = QueueController(shard.queue_manager, shard.history)
+        ui = UI({CHANNEL: shard}, config)
+        ui.show()
+        rng = random.Random(size)
+        fill(shard.queue_manager, size, rng)
+        app.processEvents()
+
+        queue = list(shard.queue_manager.get_queue())
+        start = time.perf_counter()
+        for _ in range(10):
+            ui.refresh_queue(queue)
+            app.processEvents()
+        results.add(f"ui.{size}.full_refresh", (time.perf_counter() - start) / 10 * 1e3, "ms")
+
+        # A burst of single changes, shown with one refresh
+        for i in range(100):
+            shard.queue_manager.add_user(f"burst{i}", random_sub_tier(rng), rng.randrange(10), time.time())
+        start = time.perf_counter()
+        shard.controller.flush_ui()
+        app.processEvents()
+        results.add(f"ui.{size}.refresh_100_changes", (time.perf_counter() - start) * 1e3, "ms")
+
+        ui.close()
+        shard.close()
+
+
+# Baselines
+
+def save_baseline(results, name):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = os.path.join(BASELINE_DIR, name + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "metrics": results.metrics,
+        }, f, indent=2)
+    print(f"Baseline saved to {path}")
+
+
+def compare_baseline(results, name):
+    """
+    Prints the changes against a saved baseline. Returns True if nothing regressed.
+    """
+    path = os.path.join(BASELINE_DIR, name + ".json")
+    with open(path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["metrics"]
+
+    regressions = []
+    print(f"\nCompared with baseline {name}:")
+    for metric, result in results.metrics.items():
+        if metric not in baseline or not baseline[metric]["value"]:
+            continue
+        change = result["value"] / baseline[metric]["value"] - 1
+        worse = change > REGRESSION_TOLERANCE if result["better"] == "lower" else change < -REGRESSION_TOLERANCE
+        marker = "REGRESSION" if worse else ""
+        print(f"  {metric:<45} {change:>+8.1%} {marker}")
+        if worse:
+            regressions.append(metric)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {REGRESSION_TOLERANCE:.0%}")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue bot benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--rate", type=float, default=0, help="commands per second, 0 = unthrottled")
+    parser.add_argument("--commands", type=int, default=5000, help="length of the synthetic chat stream")
+    parser.add_argument("--replay", help="recorded chat stream (JSON lines) to replay")
+    parser.add_argument("--write-stream", help="save the synthetic chat stream to this file")
+    parser.add_argument("--skip-ui", action="store_true")
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    if args.replay:
+        stream = load_stream(args.replay)
+        stream_name = os.path.splitext(os.path.basename(args.replay))[0]
+    else:
+        stream = generate_stream(args.commands, args.rate, viewers=args.commands // 2)
+        stream_name = "mix"
+    raid = generate_stream(10, 0, viewers=10, raid_at=0, raid_size=1000)
+    if args.write_stream:
+        save_stream(stream, args.write_stream)
+
+    results = Results()
+    for size in args.sizes:
+        print(f"\nQueue size {size}")
+        bench_queue_manager(results, size)
+        bench_memory(results, size)
+        bench_commands(results, size, stream, args.rate, stream_name)
+        bench_commands(results, size, raid, 0, "raid")
+        if not args.skip_ui:
+            bench_ui(results, size)
+
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline)
+    if args.compare and not compare_baseline(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,126 @@
+import logging
+import time
 from datetime import datetime
+
+import aiohttp
+import twitchio.websocket
 from twitchio.ext import commands
+from twitchio.http import Route, TwitchHTTP
+
+from bot.chat_sender import ChatSender
+from bot.join_ingest import JoinIngest
+from bot.metrics import COMMAND_SECONDS
+from bot.queue_manager import QueueManager
+from bot.queue_summary import QueueSummary
+
+logger = logging.getLogger(__name__)
+
+
+def use_twitch_endpoints(config):
+    """
+    Point TwitchIO at the configured Twitch endpoints, e.g. a local mock server.
+    TwitchIO reads these module constants on every connect and request.
+    """
+    api_base_url = config.twitch_api_base_url.rstrip("/")
+    twitchio.websocket.HOST = config.twitch_irc_url
+    Route.BASE_URL = api_base_url + "/helix"
+    TwitchHTTP.TOKEN_BASE = config.twitch_id_base_url.rstrip("/") + "/oauth2/token"
 
-from bot.twitch_auth import TwitchAuthHandler
-from helper.helper import show_popup
 
 class TwitchBot(commands.Bot):
     """
-    Twitch chat bot for managing the viewer queue.
+    Twitch chat bot for managing the viewer queues.
+
+    Joins every channel that has a shard. Commands are routed by channel,
+    so every channel works with its own queue.
     """
-    def __init__(self, controller, queue_manager, config):
+    def __init__(self, shards, config, token_manager):
+        """
+        shards: ChannelShard per channel name, the main channel first.
+        """
         self.config = config
+        use_twitch_endpoints(config)
         token_from_config = config.twitch_oauth_token
         super().__init__(
             token=token_from_config,
             prefix="!",
-            initial_channels=[config.twitch_channel]
+            initial_channels=[channel for channel in shards if channel]
         )
-        self.controller = controller
-        self.queue_manager = queue_manager
-        self.should_restart = False
+        self.shards = shards
+        # The main channel's controller shows the connection status
+        self.controller = next(iter(shards.values())).controller
+        self.token_manager = token_manager
+        # Outgoing messages go through rate limited queues per channel instead of ctx.send
+        self.chat = ChatSender(config.chat_rate_limit, aggregate_window=config.chat_aggregate_window,
+                               max_age=config.chat_reply_max_age)
+        # Joins are added to the queues in batches
+        self.join_ingest = JoinIngest(self.chat, config.join_batch_max_latency, config.join_batch_size)
+        # Cached "next in queue" line and the time of the last !queue reply per channel
+        self._queue_summaries = {channel: QueueSummary(shard.queue_manager) for channel, shard in shards.items()}
+        self._queue_replied_at = {}
+        # Channels in which the bot is a moderator or the broadcaster
+        self._mod_channels = set()
+
+        # The token manager already validated the token, so TwitchIO doesn't need to validate it again
+        if token_manager.login:
+            self._http.nick = token_manager.login
+            self._http.client_id = config.twitch_client_id
+            if token_manager.user_id:
+                self._http.user_id = int(token_manager.user_id)
+                self._connection.user_id = int(token_manager.user_id)
+        token_manager.add_listener(self._on_token_refreshed)
+
+    def update_token(self, token):
+        """
+        Use a new token for API calls and future reconnects, without reconnecting now.
+        """
+        self._http.token = token
+        self._connection._token = token
+
+    def _on_token_refreshed(self, token):
+        """
+        Called by the token manager from its timer thread.
+        """
+        self.loop.call_soon_threadsafe(self.update_token, token)
+
+    async def connect(self):
+        """
+        Connect to Twitch. Can be called again on the same instance to reconnect.
+        """
+        # TwitchIO only creates its HTTP session while validating the token, which is skipped
+        # when the login is already known. It also closes the session when the connection closes.
+        if self._http.session is None or self._http.session.closed:
+            self._http.session = aiohttp.ClientSession()
+        await super().connect()
 
     async def event_ready(self):
         """
         Called when the bot is ready. Emits connection status.
         """
-        print(f"Bot is online as {self.nick}")
+        logger.info("Bot is online as %s", self.nick)
         self.controller.connection_status.emit(True)
 
     async def event_disconnect(self):
         """
-        Called when the bot disconnects. Emits disconnection status and shows a popup.
+        Called by the supervisor when the bot loses its connection. Emits disconnection status.
         """
-        print("Bot disconnected!")
+        logger.warning("Bot disconnected!")
         self.controller.connection_status.emit(False)
-        show_popup("warning", "Bot disconnected!", "The bot got disconnected from Twitch")
+
+    async def event_userstate(self, user):
+        """
+        Called with the bot's own state in a channel, also after every message it sends there.
+        The rate limit is shared by all channels, so the higher moderator limit is only used
+        while the bot is a moderator in every joined channel.
+        """
+        if user.is_mod:
+            self._mod_channels.add(user.channel.name)
+        else:
+            self._mod_channels.discard(user.channel.name)
+        mod_everywhere = all(channel in self._mod_channels for channel in self.shards if channel)
+        rate_limit = ChatSender.MOD_RATE_LIMIT if mod_everywhere else self.config.chat_rate_limit
+        if self.chat.stats()["rate_limit"] != rate_limit:
+            self.chat.set_rate_limit(rate_limit)
 
     async def event_message(self, message):
         """
@@ -44,77 +131,121 @@ class TwitchBot(commands.Bot):
         await self.handle_commands(message)
 
     @commands.command(name="join")
+    @COMMAND_SECONDS.time("join")
     async def join_queue(self, ctx):
         """
         Command to add a user to the queue.
         """
+        shard = self.shards.get(ctx.channel.name)
+        if shard is None:
+            return
         username = ctx.author.name
 
-        if self.controller.queue_closed:
-            await ctx.send(f"@{username}, the queue is currently closed. You can’t join right now.")
+        if shard.controller.queue_closed:
+            self.reply(ctx, f"@{username}, the queue is currently closed. You can’t join right now.", "join")
             return
 
-        sub_tier = self.get_sub_tier(ctx.author)
-        times_queued = self.controller.get_queue_count(username)
-        join_time = datetime.now().timestamp()
-
         # If the user is in the selected list, they should not join.
         # Prevents users from joining again before thier times queued counter is increased.
-        if any(entry[0] == username for entry in self.queue_manager.get_selected()):
-            await ctx.send(f"@{username}, You can't join right now! You are up!")
+        state = shard.queue_manager.state_of(username)
+        if state == QueueManager.STATE_SELECTED:
+            self.reply(ctx, f"@{username}, You can't join right now! You are up!", "join")
             return
-
-        # Add user to the shared queue if not already present.
-        if not self.queue_manager.add_user(username, sub_tier, times_queued, join_time):
-            await ctx.send(f"@{username}, you're already in the queue!")
+        if state == QueueManager.STATE_QUEUED:
+            self.reply(ctx, f"@{username}, you're already in the queue!", "join")
             return
 
-        self.controller.update_ui()
-        await ctx.send(f"@{username}, you joined the queue!")
+        # The user is added with the next batch of joins, which also sends the confirmation
+        sub_tier = self.get_sub_tier(ctx.author)
+        join_time = datetime.now().timestamp()
+        self.join_ingest.submit(shard, ctx.channel, username, sub_tier, join_time)
 
     @commands.command(name="leave")
+    @COMMAND_SECONDS.time("leave")
     async def leave_queue(self, ctx):
         """
         Command to remove a user from the queue.
         """
+        shard = self.shards.get(ctx.channel.name)
+        if shard is None:
+            return
         username = ctx.author.name
         # If the user is in the selected list, they should not leave.
         # Prevents user from leaving withtout increasing times queued counter.
-        if any(entry[0] == username for entry in self.queue_manager.get_selected()):
-            await ctx.send(f"@{username}, You can't leave right now! You are up!")
+        if shard.queue_manager.is_selected(username):
+            self.reply(ctx, f"@{username}, You can't leave right now! You are up!", "leave")
             return
 
-        if self.queue_manager.remove_from_queue(username):
-            self.controller.update_ui()
-            await ctx.send(f"@{username}, you left the queue!")
+        if shard.queue_manager.remove_from_queue(username):
+            shard.controller.update_ui()
+            self.chat.confirm(ctx.channel, username, "left the queue")
+        elif self.join_ingest.cancel(shard, username):
+            # The join was still waiting in a batch
+            self.chat.confirm(ctx.channel, username, "left the queue")
         else:
-            await ctx.send(f"@{username}, you're not in the queue!")
+            self.reply(ctx, f"@{username}, you're not in the queue!", "leave")
 
     @commands.command(name="queue")
+    @COMMAND_SECONDS.time("queue")
     async def print_queue(self, ctx):
         """
         Command to show the next 9 viewers and how many remaining people are in the queue.
+        Repeated requests within the cooldown are answered by the previous reply.
         """
-        username = ctx.author.name
-        queue = self.queue_manager.get_queue()
-
-        if not queue:
-            await ctx.send("The queue is currently empty.")
+        channel_name = ctx.channel.name
+        if channel_name not in self.shards:
+            return
+        now = time.monotonic()
+        if now - self._queue_replied_at.get(channel_name, float("-inf")) < self.config.queue_reply_cooldown:
             return
 
-        max_display = 9
-        display_queue = [entry[0] for entry in queue[:max_display]]
-        queue_message = ", ".join(display_queue)
+        username = ctx.author.name
+        queue_message, remaining = self._queue_summaries[channel_name].get()
 
+        if not queue_message:
+            accepted = self.reply(ctx, "The queue is currently empty.")
         # Check if there are more people in the queue
-        remaining = len(queue) - len(display_queue)
-
-        if remaining > 0:
-            await ctx.send(f"@{username}, Next in queue: {queue_message} (+{remaining} more)")
+        elif remaining > 0:
+            accepted = self.reply(ctx, f"@{username}, Next in queue: {queue_message} (+{remaining} more)")
         else:
-            await ctx.send(f"@{username},Next in queue: {queue_message}")
+            accepted = self.reply(ctx, f"@{username},Next in queue: {queue_message}")
+
+        # A dropped reply must not silence !queue for the whole cooldown
+        if accepted:
+            self._queue_replied_at[channel_name] = now
+
+    @commands.command(name="position")
+    @COMMAND_SECONDS.time("position")
+    async def print_position(self, ctx):
+        """
+        Command to show a user's position in the queue.
+        """
+        shard = self.shards.get(ctx.channel.name)
+        if shard is None:
+            return
+        username = ctx.author.name
+        rank = shard.queue_manager.rank_of(username)
 
+        if rank is None:
+            if shard.queue_manager.is_selected(username):
+                self.reply(ctx, f"@{username}, You are up!", "position")
+            else:
+                self.reply(ctx, f"@{username}, you're not in the queue!", "position")
+            return
 
+        self.reply(ctx, f"@{username}, you are #{rank + 1} of {shard.queue_manager.get_queue_length()} in the queue.",
+                   "position")
+
+    def reply(self, ctx, text, kind=None):
+        """
+        Queue a reply to a command. Replies to moderators and the broadcaster are sent first.
+        kind: the command the reply answers. A newer reply of the same kind to the same user
+        replaces one that is still queued.
+        Returns False if the reply was dropped.
+        """
+        priority = ChatSender.PRIORITY_HIGH if ctx.author.is_mod else ChatSender.PRIORITY_NORMAL
+        key = (ctx.author.name, kind) if kind else None
+        return self.chat.send(ctx.channel, text, priority, key)
 
     def get_sub_tier(self, user):
         """
@@ -126,38 +257,7 @@ class TwitchBot(commands.Bot):
             # Ensuring the minium of 1 is needed to properly display tier 1 subscribers
             sub_tier_unclean = int(user.badges.get("subscriber"))
             sub_tier_clean = max(sub_tier_unclean // 1000, 1)
-            print("Unclean sub tier:", sub_tier_unclean, "Clean sub tier:", sub_tier_clean)
+            logger.debug("Unclean sub tier: %s Clean sub tier: %s", sub_tier_unclean, sub_tier_clean)
             return sub_tier_clean
         else:
             return 0
-
-    def run(self):
-        """
-        Override the run method to handle token refresh when encountering authentication issues.
-        """
-        try:
-            super().run()
-        except Exception as e:
-            error_str = str(e).lower()
-            token_error = False
-
-            if "401" in error_str or ("invalid" in error_str and "token" in error_str):
-                token_error = True
-            elif e.__class__.__name__.lower() == "loginfailure":
-                token_error = True
-
-            if token_error:
-                print("Detected invalid or expired token. Attempting token refresh...")
-                auth_handler = TwitchAuthHandler(self.config)
-                auth_handler.refresh_twitch_token()
-
-                # Update bots token with the refreshed token
-                self._http.token = auth_handler.oauth_token
-                self.token = auth_handler.oauth_token
-                print("Token refreshed successfully.")
-
-                # Signal that the bot should restart
-                self.should_restart = True
-            else:
-                show_popup("error", "Failed to refresh tokens!", "Failed to refresh tokens:\n" + str(e))
-                raise e
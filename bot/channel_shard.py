@@ -0,0 +1,61 @@
+import os
+
+from bot.history_store import HistoryStore
+from bot.queue_manager import QueueManager
+from bot.queue_store import QueueStore
+
+
+class ChannelShard:
+    """
+    Everything that belongs to one channel: its queue, the saved queue, the times queued
+    counters and the controller.
+
+    Shards share no state, every shard has its own locks and writer threads,
+    so a burst of joins in one channel doesn't slow down another.
+    """
+    def __init__(self, channel, config, data_dir):
+        """
+        channel: lower case channel name.
+        config: Config or ChannelConfig of the channel.
+        data_dir: directory for the channel's queue and history files.
+        """
+        self.channel = channel
+        self.config = config
+        os.makedirs(data_dir, exist_ok=True)
+        self.queue_manager = QueueManager(config)
+        self.queue_store = QueueStore(data_dir)
+        self.history = HistoryStore(os.path.join(data_dir, "history.sqlite3"), config.times_queued_scope)
+        # Set by the application once the controller for the UI or headless mode is created
+        self.controller = None
+
+    def restore(self):
+        """
+        Restore the queue saved before the last shutdown or crash and start saving changes.
+        """
+        if self.config.restore_queue:
+            saved_queue, saved_selected = self.queue_store.load()
+            self.queue_manager.restore(saved_queue, saved_selected)
+        else:
+            self.queue_store.clear()
+        self.queue_store.attach(self.queue_manager)
+        self.queue_store.start()
+
+    def close(self):
+        """
+        Write all pending changes and stop the writer threads.
+        """
+        self.queue_store.close()
+        self.history.close()
+
+
+def create_shards(config):
+    """
+    Creates a shard for every configured channel, keyed by channel name in join order.
+    The main channel keeps its data in the data directory, additional channels in channels/<name>.
+    """
+    data_dir = config.get_data_dir()
+    shards = {}
+    for index, channel in enumerate(config.get_channels()):
+        channel_dir = data_dir if index == 0 else os.path.join(data_dir, "channels", channel)
+        shards[channel] = ChannelShard(channel, config.for_channel(channel), channel_dir)
+    return shards
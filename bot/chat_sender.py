@@ -0,0 +1,240 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+from bot.metrics import CHAT_MESSAGES, CHAT_SEND_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Sized so that no window of per_seconds contains more than limit messages:
+    a quarter of the limit can be sent as a burst, the rest refills evenly over the window.
+    """
+    def __init__(self, limit, per_seconds):
+        self.per_seconds = per_seconds
+        self.set_limit(limit)
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+
+    def set_limit(self, limit):
+        """
+        Change the number of messages allowed per window.
+        """
+        self.limit = limit
+        self.capacity = max(1, limit // 4)
+        self.rate = (limit - self.capacity) / self.per_seconds
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    async def acquire(self):
+        """
+        Wait until a token is available and take it.
+        """
+        self._refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+    def refund(self):
+        """
+        Give back a token that was acquired but not used.
+        """
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class ChatSender:
+    """
+    Sends chat messages through rate limited queues.
+
+    Every channel has its own queue and drop limit. The queues share the rate limit of the
+    account and are served round-robin, so a burst in one channel can't fill the queue or
+    delay the replies of another. Within a channel messages are sent in priority order, and
+    replies to moderators go out before routine messages of any channel. Confirmations for the same action are collected for a short window
+    and sent as one message, e.g. "@a, @b, @c +47 joined the queue!".
+    A reply sent with a key replaces a queued reply with the same key, e.g. the position
+    answer to the same user, instead of taking another slot.
+    When a channel's queue is full, new routine messages for it are dropped. Routine messages that waited
+    longer than max_age are dropped when their turn comes, so chat doesn't get answers to
+    questions from minutes ago.
+    """
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 1
+
+    # Twitch allows 20 messages per 30 seconds, or 100 if the bot is a moderator or the broadcaster
+    RATE_LIMIT = 20
+    MOD_RATE_LIMIT = 100
+    RATE_PERIOD = 30
+
+    # Maximum number of names mentioned in one aggregated confirmation
+    MAX_NAMES = 10
+
+    def __init__(self, rate_limit=RATE_LIMIT, per_seconds=RATE_PERIOD, aggregate_window=1.0, max_queue=100,
+                 max_age=30.0):
+        self.aggregate_window = aggregate_window
+        self.max_queue = max_queue
+        self.max_age = max_age
+        self.sent = 0
+        self.dropped = 0
+
+        self._bucket = TokenBucket(rate_limit, per_seconds)
+        # Channel name -> heap of [priority, counter, queued at, channel, text, key] lists,
+        # lists so keyed replies can be updated
+        self._queues = {}
+        # Names of the channels with queued messages, in the order they are served
+        self._ready = deque()
+        # (channel name, key) -> queued message
+        self._keyed = {}
+        self._counter = itertools.count()
+        # (channel name, action) -> (channel, usernames)
+        self._confirmations = {}
+        self._wakeup = None
+        self._task = None
+
+    def set_rate_limit(self, rate_limit):
+        """
+        Change the number of messages allowed per period, e.g. after the bot was made a moderator.
+        """
+        self._bucket.set_limit(rate_limit)
+
+    def send(self, channel, text, priority=PRIORITY_NORMAL, key=None):
+        """
+        Queue a message for a channel. Must be called on the bot's event loop.
+        key: identifies a reply, e.g. (username, command). If a reply with the same key is still
+        queued for the channel, its text is replaced and it keeps its place in the queue.
+        Returns False if the message was dropped because the channel's queue is full.
+        """
+        self._ensure_started()
+        if key is not None:
+            queued = self._keyed.get((channel.name, key))
+            if queued is not None:
+                queued[4] = text
+                CHAT_MESSAGES.inc("replaced")
+                return True
+        queue = self._queues.get(channel.name)
+        if queue is None:
+            queue = self._queues[channel.name] = []
+            self._ready.append(channel.name)
+        elif priority != self.PRIORITY_HIGH and len(queue) >= self.max_queue:
+            self.dropped += 1
+            CHAT_MESSAGES.inc("dropped")
+            return False
+        message = [priority, next(self._counter), time.monotonic(), channel, text, key]
+        heapq.heappush(queue, message)
+        if key is not None:
+            self._keyed[(channel.name, key)] = message
+        self._wakeup.set()
+        return True
+
+    def confirm(self, channel, username, action):
+        """
+        Queue a confirmation like "@username joined the queue!".
+        Confirmations for the same channel and action within the window are sent as one message.
+        """
+        self._ensure_started()
+        key = (channel.name, action)
+        pending = self._confirmations.get(key)
+        if pending is None:
+            self._confirmations[key] = (channel, [username])
+            asyncio.get_running_loop().call_later(self.aggregate_window, self._flush_confirmation, key)
+        else:
+            pending[1].append(username)
+
+    def confirm_many(self, channel, usernames, action):
+        """
+        Queue confirmations for several users at once.
+        """
+        for username in usernames:
+            self.confirm(channel, username, action)
+
+    def stats(self):
+        """
+        Return the queue depth and the number of sent and dropped messages.
+        """
+        return {
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "rate_limit": self._bucket.limit,
+            "pending_confirmations": sum(len(names) for _, names in self._confirmations.values()),
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+    async def close(self):
+        """
+        Stop sending. Messages still in the queue are discarded.
+        """
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _flush_confirmation(self, key):
+        channel, usernames = self._confirmations.pop(key)
+        action = key[1]
+        mentions = ", ".join(f"@{name}" for name in usernames[:self.MAX_NAMES])
+        remaining = len(usernames) - self.MAX_NAMES
+        if remaining > 0:
+            mentions += f" +{remaining}"
+        self.send(channel, f"{mentions} {action}!")
+
+    def _next_message(self):
+        """
+        Pop the next message that is not stale and return (queued at, channel, text),
+        or None if no queue holds such a message.
+        A channel with a reply to a moderator goes first, otherwise the channel at the front.
+        The channel then moves to the back if it has more messages.
+        """
+        now = time.monotonic()
+        while self._ready:
+            name = next((name for name in self._ready if self._queues[name][0][0] == self.PRIORITY_HIGH),
+                        self._ready[0])
+            self._ready.remove(name)
+            queue = self._queues[name]
+            priority, _, queued_at, channel, text, key = heapq.heappop(queue)
+            if queue:
+                self._ready.append(name)
+            else:
+                del self._queues[name]
+            if key is not None:
+                del self._keyed[(channel.name, key)]
+            if priority == self.PRIORITY_HIGH or now - queued_at <= self.max_age:
+                return queued_at, channel, text
+            self.dropped += 1
+            CHAT_MESSAGES.inc("stale")
+        return None
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._ready:
+                await self._bucket.acquire()
+                message = self._next_message()
+                if message is None:
+                    # Only stale messages were left
+                    self._bucket.refund()
+                    break
+                queued_at, channel, text = message
+                try:
+                    await channel.send(text)
+                    self.sent += 1
+                    CHAT_MESSAGES.inc("sent")
+                    CHAT_SEND_SECONDS.observe(time.monotonic() - queued_at)
+                except Exception as e:
+                    logger.warning("Failed to send chat message: %s", e, extra={"channel": channel.name})
+                    self.dropped += 1
+                    CHAT_MESSAGES.inc("failed")
@@ -12,8 +12,35 @@ class Config:
         "twitch_client_secret": "",
         "twitch_app_redirect_uri": "http://localhost:8080",
         "twitch_scopes": ["chat:read", "chat:edit"],
+        "twitch_id_base_url": "https://id.twitch.tv",
+        "twitch_api_base_url": "https://api.twitch.tv",
+        "twitch_irc_url": "wss://irc-ws.chat.twitch.tv:443",
         "twitch_channel": "",
-        "sorting_option": 0
+        "twitch_channels": [],
+        "channel_settings": {},
+        "sorting_option": 0,
+        "ui_max_refresh_rate": 30,
+        "restore_queue": True,
+        "times_queued_scope": "lifetime",
+        "chat_rate_limit": 20,
+        "chat_aggregate_window": 1.0,
+        "chat_reply_max_age": 30,
+        "queue_reply_cooldown": 5,
+        "join_batch_max_latency": 0.05,
+        "join_batch_size": 100,
+        "api_enabled": True,
+        "api_host": "127.0.0.1",
+        "api_port": 8765,
+        "api_token": "",
+        "api_allowed_origins": [],
+        "overlay_enabled": True,
+        "metrics_enabled": False,
+        "log_level": "INFO",
+        "log_levels": {},
+        "log_format": "text",
+        "log_file": "queuebot.log",
+        "log_max_bytes": 1000000,
+        "log_backup_count": 3
     }
 
     def __init__(self):
@@ -50,7 +77,34 @@ class Config:
         except (IOError, TypeError) as e:
             show_popup("error",
                        "Couldn't save config",
-                       "There was an error trying to save the configuration:\n {e}")
+                       f"There was an error trying to save the configuration:\n {e}")
+
+    def get_channels(self):
+        """
+        Returns the channels the bot joins: the main channel first, then the additional
+        channels from twitch_channels. Names are lower case and without duplicates.
+        """
+        channels = []
+        for channel in [self.twitch_channel or "", *self.twitch_channels]:
+            channel = channel.strip().lstrip("#").lower()
+            if channel not in channels and (channel or not channels):
+                channels.append(channel)
+        return channels
+
+    def for_channel(self, channel):
+        """
+        Returns the config for a channel. The main channel uses this config directly,
+        additional channels get a ChannelConfig with their own settings.
+        """
+        if channel == self.get_channels()[0]:
+            return self
+        return ChannelConfig(self, channel)
+
+    def get_data_dir(self):
+        """
+        Returns the directory for data files, which is the directory of config.json.
+        """
+        return os.path.dirname(self._get_config_path())
 
     def _get_config_path(self):
         """
@@ -64,3 +118,33 @@ class Config:
             base_dir = os.path.dirname(os.path.abspath(__file__))
 
         return os.path.join(base_dir, "config.json")
+
+
+class ChannelConfig:
+    """
+    Config of an additional channel.
+
+    Settings in CHANNEL_KEYS are stored per channel in channel_settings of the main config,
+    all other settings are read from and written to the main config.
+    """
+    CHANNEL_KEYS = ("sorting_option",)
+
+    def __init__(self, config, channel):
+        object.__setattr__(self, "_config", config)
+        object.__setattr__(self, "channel", channel)
+
+    def __getattr__(self, name):
+        if name in self.CHANNEL_KEYS:
+            settings = self._config.channel_settings.get(self.channel, {})
+            if name in settings:
+                return settings[name]
+        return getattr(self._config, name)
+
+    def __setattr__(self, name, value):
+        if name in self.CHANNEL_KEYS:
+            # Replaced instead of changed, the default dict is shared
+            settings = dict(self._config.channel_settings)
+            settings[self.channel] = {**settings.get(self.channel, {}), name: value}
+            self._config.channel_settings = settings
+        else:
+            setattr(self._config, name, value)
@@ -0,0 +1,291 @@
+import asyncio
+import hmac
+import json
+import logging
+import threading
+
+from aiohttp import web, WSMsgType
+
+from bot import metrics
+from bot.queue_event import QueueEvent
+
+logger = logging.getLogger(__name__)
+
+
+def entry_to_dict(entry):
+    """
+    Returns the JSON representation of a queue entry.
+    """
+    return {
+        "username": entry.username,
+        "sub_tier": entry.sub_tier,
+        "times_queued": entry.times_queued,
+        "join_time": entry.join_us // 1000,
+    }
+
+
+def event_to_delta(event):
+    """
+    Returns the JSON representation of a queue event.
+    """
+    delta = {"op": event.kind, "list": event.target}
+    if event.kind == QueueEvent.RESET:
+        delta["entries"] = [entry_to_dict(entry) for entry in event.entries]
+        return delta
+    delta["index"] = event.index
+    if event.kind == QueueEvent.MOVED:
+        delta["to_index"] = event.to_index
+    if event.kind != QueueEvent.REMOVED:
+        delta["entry"] = entry_to_dict(event.entry)
+    return delta
+
+
+class ControlAPI:
+    """
+    Local HTTP and WebSocket API to manage and watch the queue, e.g. from a stream deck or mod tools.
+
+    HTTP:
+    - GET  /api/state                       both lists, the closed state and the sequence number
+    - POST /api/users/{username}/{action}   action is select, back, remove or done
+    - POST /api/queue/open, /api/queue/close
+
+    WebSocket /api/events: sends the state once, then every change as a delta. Clients can send
+    {"action": ..., "username": ...} or {"action": "open"/"close"} to run the same actions.
+    Deltas are collected for one loop iteration and sent as one message, which is serialized
+    once for all clients. Every message carries a sequence number, so clients can notice
+    gaps and fetch the state again. Deltas with a sequence number up to the one of the
+    state are already part of it and can be ignored.
+
+    Runs on the bot's event loop. Every request needs the token as a Bearer token or as the
+    "token" query parameter, without a token all requests are rejected. Requests from web pages
+    of other origins, including WebSocket handshakes, are rejected unless the origin is in
+    allowed_origins, so a website open in the streamer's browser can't use the API.
+    The API of the main channel serves the APIs of additional channels under /channels/<name>/,
+    e.g. /channels/<name>/api/state.
+    """
+    ACTIONS = ("select", "back", "remove", "done")
+
+    def __init__(self, controller, queue_manager, host="127.0.0.1", port=8765, token="",
+                 allowed_origins=()):
+        self.controller = controller
+        self.queue_manager = queue_manager
+        self.host = host
+        self.port = port
+        self.token = token
+        self.allowed_origins = set(allowed_origins)
+
+        self.seq = 0
+        self._clients = set()
+        # Callbacks receiving every batch of deltas on the event loop, e.g. the overlay feed
+        self._subscribers = []
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._loop = None
+        self._runner = None
+        # APIs of additional channels, served by this API
+        self._channel_apis = []
+
+        self.app = web.Application(middlewares=[self._auth_middleware])
+        self.app.router.add_get("/api/state", self._handle_state)
+        self.app.router.add_post("/api/users/{username}/{action}", self._handle_user_action)
+        self.app.router.add_post("/api/queue/{state:open|close}", self._handle_queue_state)
+        self.app.router.add_get("/api/events", self._handle_events)
+
+    def add_subscriber(self, callback):
+        """
+        Registers a callback that is called with every batch of deltas on the API's event loop.
+        """
+        self._subscribers.append(callback)
+
+    def serve_metrics(self):
+        """
+        Serves all recorded metrics at /metrics in the Prometheus text format.
+        Must be called before start.
+        """
+        self.app.router.add_get("/metrics", self._handle_metrics)
+
+    def add_channel(self, channel, api):
+        """
+        Serves the API of another channel under /channels/<channel>/. Must be called before start.
+        """
+        self.app.add_subapp(f"/channels/{channel}/", api.app)
+        self._channel_apis.append(api)
+
+    def start(self, loop):
+        """
+        Start serving on the given event loop. Can be called from any thread,
+        also before the loop is running.
+        """
+        self._loop = loop
+        for api in self._channel_apis:
+            api._loop = loop
+        asyncio.run_coroutine_threadsafe(self._start(), loop)
+
+    async def close(self):
+        """
+        Close all client connections and stop serving. Runs on the API's event loop.
+        """
+        for api in [self, *self._channel_apis]:
+            api.queue_manager.remove_listener(api._on_queue_event)
+            api.controller.queue_closed_changed.disconnect(api._on_queue_closed_changed)
+            for ws in list(api._clients):
+                await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def get_state(self):
+        """
+        Returns both lists, the closed state and the sequence number of the last delta.
+        """
+        with self.queue_manager.lock:
+            queue = self.queue_manager.get_queue()
+            selected = self.queue_manager.get_selected()
+            seq = self.seq
+        return {
+            "seq": seq,
+            "closed": self.controller.queue_closed,
+            "queue": [entry_to_dict(entry) for entry in queue],
+            "selected": [entry_to_dict(entry) for entry in selected],
+        }
+
+    def perform(self, action, username=None):
+        """
+        Run an action on the queue. Returns True if it changed anything.
+        """
+        if action == "open" or action == "close":
+            self.controller.set_queue_closed(action == "close")
+            return True
+        if action == "select":
+            changed = self.queue_manager.move_to_selected(username)
+        elif action == "back":
+            changed = self.queue_manager.move_back_to_queue(username)
+        elif action == "remove":
+            changed = self.queue_manager.remove_user(username)
+        elif action == "done":
+            changed = self.queue_manager.remove_user(username)
+            if changed:
+                self.controller.increase_queue_count(username)
+        else:
+            raise ValueError(f"Unknown action: {action}")
+        if changed:
+            self.controller.update_ui()
+        return changed
+
+    async def _start(self):
+        for api in [self, *self._channel_apis]:
+            api.queue_manager.add_listener(api._on_queue_event)
+            api.controller.queue_closed_changed.connect(api._on_queue_closed_changed)
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            logger.error("Couldn't start the control API on %s:%s: %s", self.host, self.port, e)
+            return
+        logger.info("Control API running on http://%s:%s", self.host, self.port)
+
+    @web.middleware
+    async def _auth_middleware(self, request, handler):
+        # Browsers send the Origin of the page with cross-origin requests and WebSocket handshakes
+        origin = request.headers.get("Origin")
+        if (origin is not None and origin != f"{request.scheme}://{request.host}"
+                and origin not in self.allowed_origins):
+            raise web.HTTPForbidden()
+
+        supplied = request.query.get("token", "")
+        header = request.headers.get("Authorization", "")
+        if header.startswith("Bearer "):
+            supplied = header[len("Bearer "):]
+        if not self.token or not hmac.compare_digest(supplied.encode(), self.token.encode()):
+            raise web.HTTPUnauthorized()
+        return await handler(request)
+
+    async def _handle_metrics(self, request):
+        return web.Response(text=metrics.REGISTRY.render(), content_type="text/plain",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def _handle_state(self, request):
+        return web.json_response(self.get_state())
+
+    async def _handle_user_action(self, request):
+        action = request.match_info["action"]
+        if action not in self.ACTIONS:
+            raise web.HTTPNotFound()
+        changed = self.perform(action, request.match_info["username"].lower())
+        return web.json_response({"ok": changed}, status=200 if changed else 404)
+
+    async def _handle_queue_state(self, request):
+        self.perform(request.match_info["state"])
+        return web.json_response({"ok": True})
+
+    async def _handle_events(self, request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+
+        # Registering and sending the state happen in the same loop iteration,
+        # so no delta can get lost in between
+        self._clients.add(ws)
+        try:
+            await ws.send_json({"type": "state", **self.get_state()})
+            async for message in ws:
+                if message.type == WSMsgType.TEXT:
+                    await ws.send_json(self._handle_ws_command(message.data))
+        finally:
+            self._clients.discard(ws)
+        return ws
+
+    def _handle_ws_command(self, data):
+        try:
+            command = json.loads(data)
+            action = command["action"]
+            if action not in self.ACTIONS and action not in ("open", "close"):
+                raise ValueError(f"Unknown action: {action}")
+            username = command.get("username")
+            if action in self.ACTIONS and not username:
+                raise ValueError("Missing username")
+            changed = self.perform(action, username.lower() if username else None)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return {"type": "result", "ok": False, "error": str(e)}
+        return {"type": "result", "ok": changed}
+
+    def _on_queue_event(self, event):
+        """
+        Called by the queue manager under its lock, from any thread.
+        """
+        self._push(event_to_delta(event))
+
+    def _on_queue_closed_changed(self, closed):
+        self._push({"op": "closed", "closed": closed})
+
+    def _push(self, delta):
+        with self._pending_lock:
+            self.seq += 1
+            delta["seq"] = self.seq
+            self._pending.append(delta)
+            if len(self._pending) > 1:
+                # A broadcast is already scheduled
+                return
+        self._loop.call_soon_threadsafe(self._broadcast)
+
+    def _broadcast(self):
+        with self._pending_lock:
+            deltas, self._pending = self._pending, []
+        if not deltas:
+            return
+        for callback in self._subscribers:
+            callback(deltas)
+        if not self._clients:
+            return
+        message = json.dumps({"type": "deltas", "deltas": deltas})
+        for ws in list(self._clients):
+            if ws.closed:
+                self._clients.discard(ws)
+                continue
+            self._loop.create_task(self._send(ws, message))
+
+    async def _send(self, ws, message):
+        try:
+            await ws.send_str(message)
+        except (ConnectionError, RuntimeError):
+            self._clients.discard(ws)
@@ -0,0 +1,86 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Signal:
+    """
+    Minimal replacement for a Qt signal: connected callbacks are called directly on emit.
+    """
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def disconnect(self, slot):
+        self._slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self._slots):
+            slot(*args)
+
+
+class HeadlessController:
+    """
+    Controller for running the bot without a UI.
+
+    Offers the same interface the bot uses from QueueController, without loading PyQt.
+    Connection and status changes are written to the log.
+    """
+    def __init__(self, queue_manager, history, channel=""):
+        """
+        history: HistoryStore keeping the times queued counters.
+        channel: name of the channel, used in log messages.
+        """
+        self.channel = channel
+        self.queue_manager = queue_manager
+        self.history = history
+        self.queue_closed = False
+
+        self.connection_status = Signal()
+        self.queue_closed_changed = Signal()
+        self.status_message = Signal()
+        self.connection_status.connect(self._log_connection_status)
+        self.status_message.connect(self._log_status_message)
+
+    def update_ui(self):
+        """
+        There is no UI to update.
+        """
+
+    def increase_queue_count(self, name):
+        """
+        Increase the count of how many times a user has joined the queue.
+        Moves the user to their new position if they are still queued.
+        """
+        count = self.history.increase_queue_count(name)
+        self.queue_manager.update_times_queued(name, count)
+
+    def get_queue_count(self, name):
+        """
+        Return the number of times a user has joined the queue (default is 0).
+        """
+        return self.history.get_queue_count(name)
+
+    def get_queue_counts(self, names):
+        """
+        Return the number of times several users have joined the queue, as a dict.
+        """
+        return self.history.get_queue_counts(names)
+
+    def set_queue_closed(self, closed: bool):
+        """
+        Open or close the queue.
+        """
+        if closed == self.queue_closed:
+            return
+        self.queue_closed = closed
+        self.queue_closed_changed.emit(closed)
+        logger.info("Queue of %s %s", self.channel or "the channel", "closed" if closed else "opened")
+
+    def _log_connection_status(self, connected):
+        logger.info("Connected to Twitch" if connected else "Disconnected from Twitch")
+
+    def _log_status_message(self, message):
+        logger.info(message)
@@ -0,0 +1,182 @@
+import sqlite3
+import threading
+import time
+from datetime import date
+
+
+class HistoryStore:
+    """
+    Keeps the times queued history of all viewers in an SQLite database.
+
+    Stores the lifetime times queued, the last time a viewer played and the count per stream.
+    A stream is identified by the date the application was started, so a restart during a
+    stream keeps its counts.
+
+    Counts are read lazily: a viewer is only loaded from the database the first time they are
+    looked up, after that get_queue_count is a dict lookup. Changes are written in batches by
+    a background thread, so the bot never waits for the disk.
+    """
+    SCOPE_LIFETIME = "lifetime"
+    SCOPE_STREAM = "stream"
+
+    def __init__(self, path, scope=SCOPE_LIFETIME, flush_interval=1.0):
+        """
+        path: path of the SQLite database file.
+        scope: which count get_queue_count returns, "lifetime" or "stream".
+        flush_interval: seconds between two batched writes.
+        """
+        self.path = path
+        self.scope = scope
+        self.flush_interval = flush_interval
+        self.stream_id = date.today().isoformat()
+
+        # Username -> [lifetime count, stream count, last played]
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        # Usernames with changes that are not written yet
+        self._dirty = set()
+
+        self._read_connection = self._connect()
+        self._read_lock = threading.Lock()
+        self._create_tables()
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def get_queue_count(self, username):
+        """
+        Return the number of times a user was queued, for the configured scope.
+        """
+        values = self._cache.get(username)
+        if values is None:
+            values = self._load(username)
+        return values[1] if self.scope == self.SCOPE_STREAM else values[0]
+
+    def get_queue_counts(self, usernames):
+        """
+        Return the counts of several users as a dict, for the configured scope.
+        Users that are not cached yet are loaded with a single query.
+        """
+        missing = [username for username in usernames if username not in self._cache]
+        if missing:
+            self._load_many(missing)
+        index = 1 if self.scope == self.SCOPE_STREAM else 0
+        return {username: self._cache[username][index] for username in usernames}
+
+    def increase_queue_count(self, username):
+        """
+        Increase the counts of a user and remember when they last played.
+        Returns the new count for the configured scope.
+        """
+        if username not in self._cache:
+            self._load(username)
+        with self._cache_lock:
+            values = self._cache[username]
+            values[0] += 1
+            values[1] += 1
+            values[2] = time.time()
+            self._dirty.add(username)
+        return values[1] if self.scope == self.SCOPE_STREAM else values[0]
+
+    def close(self):
+        """
+        Write all pending changes and stop the writer thread.
+        """
+        self._stop_event.set()
+        self._thread.join()
+        self._read_connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _create_tables(self):
+        with self._read_lock, self._read_connection:
+            self._read_connection.execute(
+                "CREATE TABLE IF NOT EXISTS viewers ("
+                "username TEXT PRIMARY KEY, "
+                "times_queued INTEGER NOT NULL DEFAULT 0, "
+                "last_played REAL)"
+            )
+            self._read_connection.execute(
+                "CREATE TABLE IF NOT EXISTS stream_counts ("
+                "stream_id TEXT NOT NULL, "
+                "username TEXT NOT NULL, "
+                "times_queued INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (stream_id, username))"
+            )
+
+    def _load(self, username):
+        """
+        Read a user's counts from the database into the cache.
+        """
+        with self._read_lock:
+            row = self._read_connection.execute(
+                "SELECT "
+                "(SELECT times_queued FROM viewers WHERE username = ?), "
+                "(SELECT last_played FROM viewers WHERE username = ?), "
+                "(SELECT times_queued FROM stream_counts WHERE stream_id = ? AND username = ?)",
+                (username, username, self.stream_id, username)
+            ).fetchone()
+        with self._cache_lock:
+            # Another thread may have loaded or changed the user in the meantime
+            return self._cache.setdefault(username, [row[0] or 0, row[2] or 0, row[1]])
+
+    def _load_many(self, usernames):
+        """
+        Read the counts of several users from the database into the cache.
+        """
+        rows = {}
+        # Stay below SQLite's limit of variables per statement
+        for start in range(0, len(usernames), 500):
+            chunk = usernames[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            with self._read_lock:
+                for username, times_queued, last_played in self._read_connection.execute(
+                    f"SELECT username, times_queued, last_played FROM viewers WHERE username IN ({placeholders})",
+                    chunk
+                ):
+                    rows[username] = [times_queued, 0, last_played]
+                for username, times_queued in self._read_connection.execute(
+                    f"SELECT username, times_queued FROM stream_counts "
+                    f"WHERE stream_id = ? AND username IN ({placeholders})",
+                    [self.stream_id, *chunk]
+                ):
+                    rows.setdefault(username, [0, 0, None])[1] = times_queued
+        with self._cache_lock:
+            for username in usernames:
+                # Another thread may have loaded or changed the user in the meantime
+                self._cache.setdefault(username, rows.get(username, [0, 0, None]))
+
+    def _run(self):
+        """
+        Writer loop: writes all changed users in one transaction per interval.
+        """
+        connection = self._connect()
+        while not self._stop_event.wait(self.flush_interval):
+            self._flush(connection)
+        self._flush(connection)
+        connection.close()
+
+    def _flush(self, connection):
+        with self._cache_lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = [(username, *self._cache[username]) for username in dirty]
+        if not rows:
+            return
+
+        with connection:
+            connection.executemany(
+                "INSERT INTO viewers (username, times_queued, last_played) VALUES (?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET "
+                "times_queued = excluded.times_queued, last_played = excluded.last_played",
+                [(username, lifetime, last_played) for username, lifetime, _, last_played in rows]
+            )
+            connection.executemany(
+                "INSERT INTO stream_counts (stream_id, username, times_queued) VALUES (?, ?, ?) "
+                "ON CONFLICT(stream_id, username) DO UPDATE SET times_queued = excluded.times_queued",
+                [(self.stream_id, username, stream) for username, _, stream, _ in rows]
+            )
@@ -0,0 +1,105 @@
+import asyncio
+
+from bot.queue_manager import QueueManager
+
+
+class JoinIngest:
+    """
+    Collects !join requests and adds them to the queue in batches.
+
+    During a raid hundreds of joins arrive at almost the same time. Instead of adding them
+    one by one, requests are collected per channel until batch_size requests are waiting or
+    the oldest one has waited max_latency seconds. A batch then costs one history query,
+    one bulk insert into the queue (so one journal write and one UI refresh) and one chat
+    confirmation. Repeated requests of the same user within a batch are merged.
+    Must be used from the bot's event loop.
+    """
+    def __init__(self, chat, max_latency=0.05, batch_size=100):
+        """
+        chat: ChatSender used for the confirmations.
+        max_latency: longest time in seconds a request waits before its batch is added.
+        batch_size: number of waiting requests that are added right away.
+        """
+        self.chat = chat
+        self.max_latency = max_latency
+        self.batch_size = batch_size
+        # Channel name -> pending batch
+        self._batches = {}
+
+    def submit(self, shard, channel, username, sub_tier, join_time):
+        """
+        Queue a join request for a channel shard.
+        """
+        batch = self._batches.get(shard.channel)
+        if batch is None:
+            batch = self._batches[shard.channel] = _Batch(shard, channel)
+            batch.timer = asyncio.get_running_loop().call_later(self.max_latency, self.flush, shard.channel)
+        # The first request of a user keeps its join time
+        batch.requests.setdefault(username, (sub_tier, join_time))
+        if len(batch.requests) >= self.batch_size:
+            self.flush(shard.channel)
+
+    def cancel(self, shard, username):
+        """
+        Drop the waiting join request of a user, e.g. after !leave.
+        Returns True if a request was waiting.
+        """
+        batch = self._batches.get(shard.channel)
+        return batch is not None and batch.requests.pop(username, None) is not None
+
+    def flush(self, channel_name=None):
+        """
+        Add the waiting requests of a channel, or of all channels, to the queue.
+        """
+        names = [channel_name] if channel_name is not None else list(self._batches)
+        for name in names:
+            batch = self._batches.pop(name, None)
+            if batch is None:
+                continue
+            batch.timer.cancel()
+            self._add(batch)
+
+    def _add(self, batch):
+        shard = batch.shard
+        usernames = list(batch.requests)
+        if not usernames:
+            return
+        # The queue may have been closed while the requests were waiting
+        if shard.controller.queue_closed:
+            self.chat.confirm_many(batch.channel, usernames, "couldn't join, the queue is closed")
+            return
+        counts = shard.controller.get_queue_counts(usernames)
+        added = shard.queue_manager.add_users(
+            (username, sub_tier, counts[username], join_time)
+            for username, (sub_tier, join_time) in batch.requests.items()
+        )
+        if added:
+            shard.controller.update_ui()
+            self.chat.confirm_many(batch.channel, added, "joined the queue")
+
+        # Users that were added or selected in another way while their request was waiting
+        if len(added) < len(usernames):
+            added = set(added)
+            for username in usernames:
+                if username in added:
+                    continue
+                if shard.queue_manager.state_of(username) == QueueManager.STATE_SELECTED:
+                    self.chat.send(batch.channel, f"@{username}, You can't join right now! You are up!",
+                                   key=(username, "join"))
+                else:
+                    self.chat.send(batch.channel, f"@{username}, you're already in the queue!",
+                                   key=(username, "join"))
+
+
+class _Batch:
+    """
+    Join requests of one channel waiting to be added.
+    """
+    __slots__ = ("shard", "channel", "requests", "timer")
+
+    def __init__(self, shard, channel):
+        self.shard = shard
+        self.channel = channel
+        # Username -> (sub_tier, join_time)
+        self.requests = {}
+        self.timer = None
@@ -0,0 +1,195 @@
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# Metrics are only recorded after enable(), until then every timer and counter returns
+# after a single flag check
+_enabled = False
+
+
+def enable(enabled=True):
+    """
+    Start (or stop) recording metrics.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+class _Metric:
+    """
+    Base class of a metric with optional labels. Values are stored per tuple of label values.
+    Subclasses define TYPE and _render_values(items), which returns the lines for render().
+    """
+    TYPE = ""
+
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _labels(self, label_values):
+        if not label_values:
+            return ""
+        pairs = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, label_values))
+        return "{" + pairs + "}"
+
+    def render(self):
+        """
+        Returns the metric in the Prometheus text format.
+        """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_values(items))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Counts events, e.g. sent messages or token refreshes.
+    """
+    TYPE = "counter"
+
+    def inc(self, *label_values, amount=1):
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        """
+        Returns {label values: count}.
+        """
+        with self._lock:
+            return dict(self._values)
+
+    def _render_values(self, items):
+        return [f"{self.name}{self._labels(labels)} {value}" for labels, value in items]
+
+
+class Histogram(_Metric):
+    """
+    Collects durations in seconds in cumulative buckets, plus their count, sum and maximum.
+    """
+    TYPE = "histogram"
+    # From 50 microseconds (a queue operation) to 5 seconds (a slow token refresh)
+    BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+               0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, name, help, label_names=(), buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, label_names)
+
+    def observe(self, value, *label_values):
+        if not _enabled:
+            return
+        with self._lock:
+            data = self._values.get(label_values)
+            if data is None:
+                # Counts per bucket (the last one is +Inf), count, sum, maximum
+                data = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0, 0.0, 0.0]
+            data[0][bisect_left(self.buckets, value)] += 1
+            data[1] += 1
+            data[2] += value
+            if value > data[3]:
+                data[3] = value
+
+    def time(self, *label_values):
+        """
+        Decorator timing every call of a function or coroutine function.
+        """
+        def decorate(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    if not _enabled:
+                        return await func(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - start, *label_values)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    if not _enabled:
+                        return func(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - start, *label_values)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        """
+        Returns {label values: (count, sum, maximum, estimated 99th percentile)}.
+        The percentile is the upper bound of the bucket it falls into.
+        """
+        with self._lock:
+            items = [(labels, list(data[0]), data[1], data[2], data[3]) for labels, data in self._values.items()]
+        result = {}
+        for labels, counts, count, total, maximum in items:
+            result[labels] = (count, total, maximum, self._percentile(counts, count, maximum, 0.99))
+        return result
+
+    def _percentile(self, counts, count, maximum, fraction):
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            seen += bucket_count
+            if seen >= count * fraction:
+                return min(bound, maximum)
+        return maximum
+
+    def _render_values(self, items):
+        lines = []
+        for labels, (counts, count, total, _) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                bucket_labels = self._labels(labels)[:-1] + "," if labels else "{"
+                lines.append(f'{self.name}_bucket{bucket_labels}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{self._labels(labels)} {total}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    All metrics of the application.
+    """
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text format.
+        """
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Hot path metrics, labelled by command, operation or refresh kind
+COMMAND_SECONDS = Histogram("queuebot_command_seconds", "Time to handle a chat command", ["command"])
+QUEUE_OPERATION_SECONDS = Histogram("queuebot_queue_operation_seconds",
+                                    "Time of queue changes and sorts", ["operation"])
+UI_REFRESH_SECONDS = Histogram("queuebot_ui_refresh_seconds", "Time to send changes to the UI", ["kind"])
+CHAT_SEND_SECONDS = Histogram("queuebot_chat_send_seconds",
+                              "Time from queueing a chat message until it is sent")
+CHAT_MESSAGES = Counter("queuebot_chat_messages_total", "Chat messages by result", ["result"])
+TOKEN_REFRESH_SECONDS = Histogram("queuebot_token_refresh_seconds", "Time to refresh the Twitch token")
+TOKEN_REFRESHES = Counter("queuebot_token_refreshes_total", "Token refreshes by result", ["result"])
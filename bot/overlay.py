@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+
+from aiohttp import web
+
+# Short names for lists and operations, to keep the messages small
+_LISTS = {"queue": "q", "selected": "s"}
+_OPS = {"inserted": "i", "removed": "r", "moved": "m", "changed": "c", "reset": "z", "closed": "x"}
+# Tells the client to fetch /overlay/state again
+_RESYNC = b"event: resync\ndata: {}\n\n"
+
+
+def compact_entry(entry):
+    """
+    Returns an entry as [username, sub tier, times queued].
+    """
+    return [entry.username, entry.sub_tier, entry.times_queued]
+
+
+def compact_delta(delta):
+    """
+    Returns a delta of the control API in compact form: [seq, op, ...].
+    - inserted/changed: [seq, "i"/"c", list, index, entry]
+    - removed:          [seq, "r", list, index]
+    - moved:            [seq, "m", list, from index, to index, entry]
+    - reset:            [seq, "z", list, entries]
+    - closed:           [seq, "x", closed]
+    """
+    op = delta["op"]
+    if op == "closed":
+        return [delta["seq"], "x", delta["closed"]]
+
+    def entry(data):
+        return [data["username"], data["sub_tier"], data["times_queued"]]
+
+    result = [delta["seq"], _OPS[op], _LISTS[delta["list"]]]
+    if op == "reset":
+        result.append([entry(data) for data in delta["entries"]])
+        return result
+    result.append(delta["index"])
+    if op == "moved":
+        result.append(delta["to_index"])
+    if op != "removed":
+        result.append(entry(delta["entry"]))
+    return result
+
+
+class OverlayFeed:
+    """
+    Browser source overlay for OBS, served by the control API.
+
+    - GET /overlay          the overlay page
+    - GET /overlay/state    compact snapshot of both lists, cached until the next change and
+                            served with an ETag, so unchanged states cost a 304
+    - GET /overlay/events   server-sent events with compact deltas
+
+    A client fetches the state, then opens the event stream with ?since=<seq of the state>.
+    Recent deltas are kept in a backlog, so a reconnecting client continues where it stopped.
+    If the backlog does not reach back far enough, the client gets a "resync" event and
+    fetches the state again with a single request.
+    """
+    # Number of delta batches kept for reconnecting clients
+    BACKLOG_SIZE = 1000
+    # Messages buffered per client before a slow client is told to resync
+    CLIENT_BUFFER = 256
+    # Seconds between keep-alive comments on idle streams
+    KEEPALIVE_INTERVAL = 15
+
+    def __init__(self, api):
+        self.api = api
+        # Changes on every start, so ETags of an earlier run never match
+        self._instance = uuid.uuid4().hex[:8]
+        self._snapshot = None
+        self._backlog = deque(maxlen=self.BACKLOG_SIZE)
+        self._clients = set()
+
+        with open(os.path.join(os.path.dirname(__file__), "assets", "overlay.html"), "rb") as f:
+            self._page = f.read()
+
+        api.add_subscriber(self._on_deltas)
+        api.app.on_shutdown.append(self._on_shutdown)
+        api.app.router.add_get("/overlay", self._handle_page)
+        api.app.router.add_get("/overlay/state", self._handle_state)
+        api.app.router.add_get("/overlay/events", self._handle_events)
+
+    def get_snapshot(self):
+        """
+        Returns the current state as (etag, body). Only rebuilt after a change.
+        """
+        queue_manager = self.api.queue_manager
+        with queue_manager.lock:
+            seq = self.api.seq
+            snapshot = self._snapshot
+            if snapshot is None or snapshot[0] != seq:
+                body = json.dumps({
+                    "seq": seq,
+                    "closed": self.api.controller.queue_closed,
+                    "q": [compact_entry(entry) for entry in queue_manager.get_queue()],
+                    "s": [compact_entry(entry) for entry in queue_manager.get_selected()],
+                }, separators=(",", ":")).encode()
+                snapshot = self._snapshot = (seq, f'"{self._instance}-{seq}"', body)
+        return snapshot[1], snapshot[2]
+
+    async def _handle_page(self, request):
+        return web.Response(body=self._page, content_type="text/html")
+
+    async def _handle_state(self, request):
+        etag, body = self.get_snapshot()
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    async def _handle_events(self, request):
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+
+        queue = asyncio.Queue(maxsize=self.CLIENT_BUFFER)
+        # Registering and reading the backlog happen without awaiting in between,
+        # so every batch is either in the backlog or sent to the queue
+        self._clients.add(queue)
+        try:
+            for message in self._backlog_since(request.query.get("since") or request.headers.get("Last-Event-ID")):
+                await response.write(message)
+                if message is _RESYNC:
+                    return response
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self.KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    message = b": keep-alive\n\n"
+                if message is None:
+                    # The server is shutting down
+                    break
+                await response.write(message)
+                if message is _RESYNC:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(queue)
+        return response
+
+    async def _on_shutdown(self, app):
+        """
+        Ends all event streams, so the server doesn't wait for them.
+        """
+        for queue in list(self._clients):
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def _backlog_since(self, since):
+        """
+        Returns the buffered messages after a sequence number, or a resync message if
+        the backlog does not reach back far enough.
+        """
+        try:
+            since = int(since)
+        except (TypeError, ValueError):
+            return [_RESYNC]
+        if since >= self.api.seq:
+            return []
+        if not self._backlog or self._backlog[0][0] > since + 1:
+            return [_RESYNC]
+        return [message for first_seq, last_seq, message in self._backlog if last_seq > since]
+
+    def _on_deltas(self, deltas):
+        """
+        Called by the control API on the event loop with every batch of deltas.
+        """
+        data = json.dumps([compact_delta(delta) for delta in deltas], separators=(",", ":"))
+        message = f"id: {deltas[-1]['seq']}\ndata: {data}\n\n".encode()
+        self._backlog.append((deltas[0]["seq"], deltas[-1]["seq"], message))
+        for queue in list(self._clients):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # The client can't keep up, it gets the current state instead
+                self._clients.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(_RESYNC)
+
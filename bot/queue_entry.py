@@ -0,0 +1,49 @@
+import sys
+
+
+class QueueEntry:
+    """
+    A single viewer in the queue or the selected list.
+
+    The fields are named slots. The join time is stored as integer microseconds, so it sorts
+    exactly and survives saving without float rounding. Usernames are interned.
+    """
+    __slots__ = ("username", "sub_tier", "times_queued", "join_us")
+
+    def __init__(self, username, sub_tier, times_queued, join_time):
+        self.username = sys.intern(username)
+        self.sub_tier = sub_tier
+        self.times_queued = times_queued
+        self.join_us = int(join_time * 1_000_000)
+
+    @classmethod
+    def from_join_us(cls, username, sub_tier, times_queued, join_us):
+        """
+        Creates an entry from a join time given in integer microseconds.
+        """
+        entry = cls.__new__(cls)
+        entry.username = sys.intern(username)
+        entry.sub_tier = sub_tier
+        entry.times_queued = times_queued
+        entry.join_us = join_us
+        return entry
+
+    @property
+    def join_time(self):
+        """
+        Returns the join time as a timestamp in seconds.
+        """
+        return self.join_us / 1_000_000
+
+    def replace(self, **changes):
+        """
+        Returns a copy of the entry with the given fields changed.
+        """
+        entry = QueueEntry.__new__(QueueEntry)
+        for field in self.__slots__:
+            setattr(entry, field, changes.get(field, getattr(self, field)))
+        return entry
+
+    def __repr__(self):
+        return (f"QueueEntry(username={self.username!r}, sub_tier={self.sub_tier}, "
+                f"times_queued={self.times_queued}, join_time={self.join_time})")
@@ -0,0 +1,33 @@
+class QueueEvent:
+    """
+    Describes a single change of the queue or the selected list.
+
+    kind: one of the event kinds below.
+    target: "queue" or "selected".
+    index: position of the changed entry (the old position for moved entries).
+    to_index: new position of a moved entry.
+    entry: the changed QueueEntry.
+    entries: full list of entries for reset events.
+    """
+    INSERTED = "inserted"
+    REMOVED = "removed"
+    MOVED = "moved"
+    CHANGED = "changed"
+    RESET = "reset"
+
+    QUEUE = "queue"
+    SELECTED = "selected"
+
+    __slots__ = ("kind", "target", "index", "to_index", "entry", "entries")
+
+    def __init__(self, kind, target, index=None, to_index=None, entry=None, entries=None):
+        self.kind = kind
+        self.target = target
+        self.index = index
+        self.to_index = to_index
+        self.entry = entry
+        self.entries = entries
+
+    def __repr__(self):
+        return (f"QueueEvent(kind={self.kind!r}, target={self.target!r}, index={self.index}, "
+                f"to_index={self.to_index}, entry={self.entry!r})")
@@ -1,127 +1,508 @@
+import threading
+from bisect import bisect_left
+from itertools import chain, islice
+
+from bot.metrics import QUEUE_OPERATION_SECONDS
+from bot.queue_entry import QueueEntry
+from bot.queue_event import QueueEvent
+
+
+class _OrderedIndex:
+    """
+    Keeps queue entries ordered by a sort key.
+
+    The entries are stored in sorted blocks of BLOCK_SIZE to 2 * BLOCK_SIZE entries, with the
+    key of the last entry of every block. A binary search over those keys finds the block and
+    a binary search inside the block finds the position, so inserts and removals only shift
+    the entries of one block instead of the whole queue. Ranks add up the block lengths.
+    Sort keys are computed during the search and never stored per entry.
+    """
+    BLOCK_SIZE = 1000
+    # add_many rebuilds the blocks in one pass instead of inserting entries one by one once the
+    # batch is at least 1 / MERGE_RATIO of the index, as the rebuild touches every entry
+    MERGE_RATIO = 8
+
+    def __init__(self, key, entries=()):
+        self.key = key
+        self._build(sorted(entries, key=key))
+
+    def __len__(self):
+        return sum(self._lengths)
+
+    def __iter__(self):
+        return chain.from_iterable(self._blocks)
+
+    def _build(self, entries):
+        """
+        Replaces the content with already sorted entries.
+        """
+        size = self.BLOCK_SIZE
+        self._blocks = [entries[start:start + size] for start in range(0, len(entries), size)]
+        self._maxes = [self.key(block[-1]) for block in self._blocks]
+        self._lengths = [len(block) for block in self._blocks]
+
+    def _locate(self, key):
+        """
+        Returns (block index, position in the block) where an entry with the key belongs.
+        """
+        block_index = bisect_left(self._maxes, key)
+        if block_index == len(self._maxes):
+            block_index -= 1
+        return block_index, bisect_left(self._blocks[block_index], key, key=self.key)
+
+    def add(self, entry):
+        """
+        Inserts an entry at its sorted position and returns that position.
+        """
+        key = self.key(entry)
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(key)
+            self._lengths.append(1)
+            return 0
+        block_index, position = self._locate(key)
+        block = self._blocks[block_index]
+        block.insert(position, entry)
+        self._lengths[block_index] += 1
+        if position == len(block) - 1:
+            self._maxes[block_index] = key
+        rank = sum(self._lengths[:block_index]) + position
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self._split(block_index)
+        return rank
+
+    def add_many(self, entries):
+        """
+        Inserts several entries.
+        Returns (position, entry) pairs in ascending order of the final positions.
+        """
+        new = sorted(entries, key=self.key)
+        if len(new) * self.MERGE_RATIO < len(self):
+            # Inserting in ascending order never moves the entries inserted before
+            return [(self.add(entry), entry) for entry in new]
+
+        # Both runs are sorted already, so the sort only merges them
+        merged = sorted([*self, *new], key=self.key)
+        self._build(merged)
+        added = {id(entry) for entry in new}
+        return [(position, entry) for position, entry in enumerate(merged) if id(entry) in added]
+
+    def remove(self, entry):
+        """
+        Removes an entry and returns the position it was stored at.
+        """
+        block_index, position = self._locate(self.key(entry))
+        block = self._blocks[block_index]
+        del block[position]
+        self._lengths[block_index] -= 1
+        rank = sum(self._lengths[:block_index]) + position
+        if not block:
+            del self._blocks[block_index]
+            del self._maxes[block_index]
+            del self._lengths[block_index]
+        else:
+            if position == len(block):
+                self._maxes[block_index] = self.key(block[-1])
+            if len(block) < self.BLOCK_SIZE // 2 and len(self._blocks) > 1:
+                self._merge(block_index)
+        return rank
+
+    def index(self, entry):
+        """
+        Returns the position of an entry that is part of the index.
+        """
+        block_index, position = self._locate(self.key(entry))
+        return sum(self._lengths[:block_index]) + position
+
+    def at(self, rank):
+        """
+        Returns the entry at a position.
+        """
+        for block in self._blocks:
+            if rank < len(block):
+                return block[rank]
+            rank -= len(block)
+        raise IndexError("rank out of range")
+
+    def top(self, count):
+        """
+        Returns the first entries as a list.
+        """
+        return list(islice(self, count))
+
+    def _split(self, block_index):
+        block = self._blocks[block_index]
+        half = len(block) // 2
+        self._blocks[block_index:block_index + 1] = [block[:half], block[half:]]
+        self._maxes.insert(block_index, self.key(block[half - 1]))
+        self._lengths[block_index:block_index + 1] = [half, len(block) - half]
+
+    def _merge(self, block_index):
+        """
+        Joins a small block with its neighbour and splits the result again if it got too large.
+        """
+        if block_index == len(self._blocks) - 1:
+            block_index -= 1
+        merged = self._blocks[block_index] + self._blocks[block_index + 1]
+        self._blocks[block_index:block_index + 2] = [merged]
+        del self._maxes[block_index]
+        self._lengths[block_index:block_index + 2] = [len(merged)]
+        if len(merged) > 2 * self.BLOCK_SIZE:
+            self._split(block_index)
+
+
 class QueueManager:
     """
     Manages the viewer queue and selected lists.
+
+    Used from both the bot thread and the UI thread. Every change runs under a lock
+    and only touches a few entries, so callers never wait for long.
+    get_queue and get_selected return immutable snapshots, which readers can use
+    without locking while the lists keep changing.
     """
+    # Sort keys for every sorting option of the config.
+    # The username makes every key unique, so equal sort values still have a stable position.
+    SORT_KEYS = {
+        # times queued (ascending), subscriber tier (descending), join time (ascending)
+        0: lambda x: (x.times_queued, -x.sub_tier, x.join_us, x.username),
+        # subscriber tier (descending), join time (ascending)
+        1: lambda x: (-x.sub_tier, x.join_us, x.username),
+        # times queued (ascending), join time (ascending)
+        2: lambda x: (x.times_queued, x.join_us, x.username),
+        # join time (ascending)
+        3: lambda x: (x.join_us, x.username),
+    }
+
+    # Values returned by state_of
+    STATE_QUEUED = "queued"
+    STATE_SELECTED = "selected"
+
     def __init__(self, config):
-        self.queue = []
-        self.selected = []
         self.config = config
+        self.lock = threading.RLock()
+        self._selected_list = []
+        # Username -> entry lookups for both lists
+        self._queued = {}
+        self._selected = {}
+        # Ordering of the queue for the active sort option, rebuilt when the option changes
+        self._sort_option = self.config.sorting_option
+        self._order = _OrderedIndex(self._sort_key(self._sort_option))
+        # Callbacks receiving a QueueEvent for every change
+        self._listeners = []
+        # Immutable snapshots handed out to readers, rebuilt after changes
+        self._queue_snapshot = ()
+        self._selected_snapshot = ()
+        self._queue_stale = False
+        self._selected_stale = False
 
+    @property
+    def queue(self):
+        return self.get_queue()
+
+    @property
+    def selected(self):
+        return self.get_selected()
+
+    def _sort_key(self, option):
+        """
+        Returns the sort key for a sort option.
+        Falls back to sorting by join time for unknown options.
+        """
+        return self.SORT_KEYS.get(option, self.SORT_KEYS[3])
+
+    def add_listener(self, callback):
+        """
+        Registers a callback that is called with a QueueEvent for every change
+        of the queue or the selected list.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        Unregisters a callback added with add_listener.
+        """
+        self._listeners.remove(callback)
+
+    def is_queued(self, username):
+        """
+        Returns True if the user is in the queue.
+        """
+        return username in self._queued
+
+    def is_selected(self, username):
+        """
+        Returns True if the user is in the selected list.
+        """
+        return username in self._selected
+
+    def state_of(self, username):
+        """
+        Returns STATE_QUEUED, STATE_SELECTED or None if the user is in neither list.
+        """
+        if username in self._queued:
+            return self.STATE_QUEUED
+        if username in self._selected:
+            return self.STATE_SELECTED
+        return None
+
+    @QUEUE_OPERATION_SECONDS.time("add_user")
     def add_user(self, username, sub_tier, times_queued, join_time):
         """
         Adds a user to the queue if they are not already present in either list.
         Returns True if the user is added, otherwise False.
         """
-        if any(entry[0] == username for entry in self.queue) or any(entry[0] == username for entry in self.selected):
-            return False
-        self.queue.append((username, sub_tier, times_queued, join_time))
-        self.sort_queue()
-        return True
+        with self.lock:
+            if username in self._queued or username in self._selected:
+                return False
+            entry = QueueEntry(username, sub_tier, times_queued, join_time)
+            index = self._insert_queued(entry)
+            self._notify(QueueEvent(QueueEvent.INSERTED, QueueEvent.QUEUE, index, entry=entry))
+            return True
+
+    @QUEUE_OPERATION_SECONDS.time("add_users")
+    def add_users(self, users):
+        """
+        Adds several users at once, e.g. a burst of joins.
+        users: (username, sub_tier, times_queued, join_time) tuples. Users already in either
+        list or listed twice are skipped. The ordering is updated with one bulk insert and
+        listeners get the inserted entries in ascending position order.
+        Returns the usernames that were added.
+        """
+        with self.lock:
+            entries = []
+            for username, sub_tier, times_queued, join_time in users:
+                if username in self._queued or username in self._selected:
+                    continue
+                entry = QueueEntry(username, sub_tier, times_queued, join_time)
+                self._queued[entry.username] = entry
+                entries.append(entry)
+            if not entries:
+                return []
+
+            self._queue_stale = True
+            for index, entry in self._order.add_many(entries):
+                self._notify(QueueEvent(QueueEvent.INSERTED, QueueEvent.QUEUE, index, entry=entry))
+            return [entry.username for entry in entries]
 
+    @QUEUE_OPERATION_SECONDS.time("remove_from_queue")
     def remove_from_queue(self, username):
         """
         Removes a user from the queue.
         Returns True if the user was found and removed, otherwise False.
         """
-        if any(entry[0] == username for entry in self.queue):
-            self.queue = [entry for entry in self.queue if entry[0] != username]
+        with self.lock:
+            entry = self._queued.get(username)
+            if entry is None:
+                return False
+            index = self._remove_queued(entry)
+            self._notify(QueueEvent(QueueEvent.REMOVED, QueueEvent.QUEUE, index, entry=entry))
             return True
-        return False
 
+    @QUEUE_OPERATION_SECONDS.time("remove_user")
     def remove_user(self, username):
         """
         Removes a user from the selected list.
         Returns True if the user was found and removed, otherwise False.
         """
-        if any(entry[0] == username for entry in self.selected):
-            self.selected = [entry for entry in self.selected if entry[0] != username]
+        with self.lock:
+            entry = self._selected.get(username)
+            if entry is None:
+                return False
+            index = self._remove_selected(entry)
+            self._notify(QueueEvent(QueueEvent.REMOVED, QueueEvent.SELECTED, index, entry=entry))
             return True
-        return False
 
+    @QUEUE_OPERATION_SECONDS.time("sort_queue")
     def sort_queue(self):
         """
         Sorts the queue based on the current sort option from the config.
+        The ordering is only rebuilt if the option changed. Listeners are told that the
+        queue order has been replaced.
+        """
+        with self.lock:
+            if self.config.sorting_option != self._sort_option:
+                self._sort_option = self.config.sorting_option
+                self._order = _OrderedIndex(self._sort_key(self._sort_option), self._queued.values())
+            self._queue_stale = True
+            self._notify(QueueEvent(QueueEvent.RESET, QueueEvent.QUEUE, entries=self.get_queue()))
+
+    @QUEUE_OPERATION_SECONDS.time("update_times_queued")
+    def update_times_queued(self, username, times_queued):
+        """
+        Updates the times queued counter stored for a user.
+        Only that user is moved inside the ordering, the rest of the queue stays untouched.
+        Returns True if the user was found in either list, otherwise False.
         """
-        sort_option = self.config.sorting_option
-
-        match sort_option:
-            case 0:
-                self._sort_by_times_queued_subtier()
-            case 1:
-                self._sort_by_subtier()
-            case 2:
-                self._sort_by_times_queued()
-            case 3:
-                self._sort_by_join_time()
-            case _:
-                # Fallback
-                self._sort_by_join_time()
+        with self.lock:
+            entry = self._queued.get(username)
+            if entry is not None:
+                # Entries are replaced instead of changed, so snapshots handed out earlier stay untouched
+                new_entry = entry.replace(times_queued=times_queued)
+                old_index = self._remove_queued(entry)
+                new_index = self._insert_queued(new_entry)
+                if old_index == new_index:
+                    self._notify(QueueEvent(QueueEvent.CHANGED, QueueEvent.QUEUE, old_index, entry=new_entry))
+                else:
+                    self._notify(QueueEvent(QueueEvent.MOVED, QueueEvent.QUEUE, old_index, new_index, new_entry))
+                return True
+
+            entry = self._selected.get(username)
+            if entry is not None:
+                new_entry = entry.replace(times_queued=times_queued)
+                index = self._selected_list.index(entry)
+                self._selected_list[index] = new_entry
+                self._selected[username] = new_entry
+                self._selected_stale = True
+                self._notify(QueueEvent(QueueEvent.CHANGED, QueueEvent.SELECTED, index, entry=new_entry))
+                return True
+            return False
 
+    @QUEUE_OPERATION_SECONDS.time("move_to_selected")
     def move_to_selected(self, username):
         """
         Moves a user from the queue to the selected list.
         Returns True if the user was found and moved, otherwise False.
         """
-        user = next((entry for entry in self.queue if entry[0] == username), None)
-        if user:
-            self.queue.remove(user)
-            self.selected.append(user)
-            return True
-        return False
+        with self.lock:
+            user = self._queued.get(username)
+            if user:
+                index = self._remove_queued(user)
+                self._notify(QueueEvent(QueueEvent.REMOVED, QueueEvent.QUEUE, index, entry=user))
+                index = self._append_selected(user)
+                self._notify(QueueEvent(QueueEvent.INSERTED, QueueEvent.SELECTED, index, entry=user))
+                return True
+            return False
 
+    @QUEUE_OPERATION_SECONDS.time("move_back_to_queue")
     def move_back_to_queue(self, username):
         """
         Moves a user from the selected list back to the queue.
         Returns True if the user was found and moved, otherwise False.
         """
-        user = next((entry for entry in self.selected if entry[0] == username), None)
-        if user:
-            self.selected.remove(user)
-            self.queue.append(user)
-            self.sort_queue()
-            return True
-        return False
+        with self.lock:
+            user = self._selected.get(username)
+            if user:
+                index = self._remove_selected(user)
+                self._notify(QueueEvent(QueueEvent.REMOVED, QueueEvent.SELECTED, index, entry=user))
+                index = self._insert_queued(user)
+                self._notify(QueueEvent(QueueEvent.INSERTED, QueueEvent.QUEUE, index, entry=user))
+                return True
+            return False
+
+    def restore(self, queue_entries, selected_entries):
+        """
+        Replaces both lists with previously saved entries, e.g. after a restart.
+        Listeners receive a reset event for each list.
+        """
+        with self.lock:
+            self._queued = {}
+            self._selected = {}
+            self._selected_list = []
+            for entry in queue_entries:
+                self._queued[entry.username] = entry
+            self._order = _OrderedIndex(self._sort_key(self._sort_option), self._queued.values())
+            for entry in selected_entries:
+                self._append_selected(entry)
+            self._queue_stale = True
+            self._selected_stale = True
+            self._notify(QueueEvent(QueueEvent.RESET, QueueEvent.QUEUE, entries=self.get_queue()))
+            self._notify(QueueEvent(QueueEvent.RESET, QueueEvent.SELECTED, entries=self.get_selected()))
 
     def get_queue(self):
         """
-        Returns the current queue list.
+        Returns the current queue as an immutable snapshot.
+        """
+        if self._queue_stale:
+            with self.lock:
+                if self._queue_stale:
+                    self._queue_snapshot = tuple(self._order)
+                    self._queue_stale = False
+        return self._queue_snapshot
+
+    def get_top(self, count):
+        """
+        Returns the first entries of the queue, without building a snapshot of the whole queue.
+        """
+        with self.lock:
+            return tuple(self._order.top(count))
+
+    def get_queue_length(self):
+        """
+        Returns the number of users in the queue.
+        """
+        return len(self._queued)
+
+    def rank_of(self, username):
+        """
+        Returns the 0-based position of a user in the queue, or None if they are not queued.
+        Uses a binary search on the current ordering instead of scanning the queue.
+        """
+        with self.lock:
+            entry = self._queued.get(username)
+            if entry is None:
+                return None
+            return self._order.index(entry)
+
+    def user_at(self, rank):
+        """
+        Returns the queue entry at a 0-based position, or None if the queue is shorter.
         """
-        return self.queue
+        with self.lock:
+            if not 0 <= rank < len(self._queued):
+                return None
+            return self._order.at(rank)
 
     def get_selected(self):
         """
-        Returns the current selected list.
+        Returns the current selected list as an immutable snapshot.
+        """
+        if self._selected_stale:
+            with self.lock:
+                if self._selected_stale:
+                    self._selected_snapshot = tuple(self._selected_list)
+                    self._selected_stale = False
+        return self._selected_snapshot
+
+    def _insert_queued(self, entry):
+        """
+        Adds an entry to the queue index and the ordering.
+        Returns its position in the ordering.
         """
-        return self.selected
-    
-    def _sort_by_times_queued_subtier(self):
+        self._queued[entry.username] = entry
+        self._queue_stale = True
+        return self._order.add(entry)
+
+    def _remove_queued(self, entry):
         """
-        Sorts the queue based on:
-          - times queued (ascending),
-          - subscriber tier (descending),
-          - join time (ascending).
+        Removes an entry from the queue index and the ordering.
+        Returns its former position in the ordering.
         """
-        self.queue.sort(key=lambda x: (x[2], -x[1], x[3]))
+        del self._queued[entry.username]
+        self._queue_stale = True
+        return self._order.remove(entry)
 
-    def _sort_by_subtier(self):
+    def _append_selected(self, entry):
         """
-        Sorts the queue based on:
-          - subscriber tier (descending),
-          - join time (ascending).
+        Appends an entry to the selected list and returns its position.
         """
-        self.queue.sort(key=lambda x: (-x[1], x[3]))
+        self._selected[entry.username] = entry
+        self._selected_list.append(entry)
+        self._selected_stale = True
+        return len(self._selected_list) - 1
 
-    def _sort_by_times_queued(self):
+    def _remove_selected(self, entry):
         """
-        Sorts the queue based on:
-          - times queued (ascending),
-          - join time (ascending).
+        Removes an entry from the selected list and returns its former position.
         """
-        self.queue.sort(key=lambda x: (x[2], x[3]))
+        del self._selected[entry.username]
+        index = self._selected_list.index(entry)
+        del self._selected_list[index]
+        self._selected_stale = True
+        return index
 
-    def _sort_by_join_time(self):
+    def _notify(self, event):
         """
-        Sorts the queue based on:
-          - join time (ascending).
+        Passes an event to all registered listeners.
         """
-        self.queue.sort(key=lambda x: x[3])
+        for callback in self._listeners:
+            callback(event)
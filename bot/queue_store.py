@@ -0,0 +1,205 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from bot.queue_entry import QueueEntry
+from bot.queue_event import QueueEvent
+
+
+class QueueStore:
+    """
+    Saves the queue and the selected list so they survive a crash or restart.
+
+    Every change is appended to a journal file by a background writer thread.
+    The journal is synced to disk at most once per flush interval, so a burst of joins
+    costs a single fsync. After a number of journal records the writer saves a compact
+    snapshot and starts a new journal, which keeps startup replay short.
+
+    Journal records are JSON arrays:
+      ["a", target, username, sub_tier, times_queued, join_us]  add to "q"ueue or "s"elected
+      ["d", target, username]                                   remove from a list
+      ["u", target, username, times_queued]                     update times queued
+    All records set absolute values, so replaying a journal twice gives the same state.
+    """
+    SNAPSHOT_FILE = "queue_snapshot.json"
+    JOURNAL_FILE = "queue_journal.jsonl"
+
+    _TARGETS = {QueueEvent.QUEUE: "q", QueueEvent.SELECTED: "s"}
+
+    def __init__(self, directory, flush_interval=0.2, snapshot_every=5000):
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+        self.journal_path = os.path.join(directory, self.JOURNAL_FILE)
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+
+        # State as saved on disk, only changed by load() and the writer thread
+        self._queue = {}
+        self._selected = {}
+
+        self._records = queue.Queue()
+        self._journal = None
+        self._journal_records = 0
+        self._thread = None
+
+    def load(self):
+        """
+        Reads the last snapshot and replays the journal written after it.
+        Returns (queue_entries, selected_entries).
+        """
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._queue = {record[0]: record[1:] for record in snapshot.get("queue", [])}
+            self._selected = {record[0]: record[1:] for record in snapshot.get("selected", [])}
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._queue, self._selected = {}, {}
+
+        try:
+            with open(self.journal_path, "r+b") as f:
+                data = f.read()
+                # A crash while writing can leave an incomplete last line. It is cut off,
+                # otherwise the next record would be appended to it and lost on the next load.
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    f.truncate(end)
+            for line in data[:end].splitlines():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._apply(record)
+                self._journal_records += 1
+        except FileNotFoundError:
+            pass
+
+        queue_entries = [QueueEntry.from_join_us(name, *values) for name, values in self._queue.items()]
+        selected_entries = [QueueEntry.from_join_us(name, *values) for name, values in self._selected.items()]
+        return queue_entries, selected_entries
+
+    def clear(self):
+        """
+        Discards all saved data.
+        """
+        self._queue, self._selected = {}, {}
+        self._write_snapshot()
+
+    def start(self):
+        """
+        Starts the background writer thread.
+        """
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """
+        Writes all pending records and stops the writer thread.
+        """
+        if self._thread:
+            self._records.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def attach(self, queue_manager):
+        """
+        Records every change of the given queue manager.
+        """
+        queue_manager.add_listener(self._on_queue_event)
+
+    def _on_queue_event(self, event):
+        """
+        Turns a queue event into a journal record.
+        Reset events only change the order, which is not saved.
+        """
+        target = self._TARGETS[event.target]
+        entry = event.entry
+        if event.kind == QueueEvent.INSERTED:
+            self._records.put(["a", target, entry.username, entry.sub_tier, entry.times_queued, entry.join_us])
+        elif event.kind == QueueEvent.REMOVED:
+            self._records.put(["d", target, entry.username])
+        elif event.kind in (QueueEvent.MOVED, QueueEvent.CHANGED):
+            self._records.put(["u", target, entry.username, entry.times_queued])
+
+    def _apply(self, record):
+        """
+        Applies a journal record to the saved state.
+        """
+        op = record[0]
+        entries = self._queue if record[1] == "q" else self._selected
+        username = record[2]
+        if op == "a":
+            # Re-adding moves the entry to the end, which keeps the selected order on replay
+            entries.pop(username, None)
+            entries[username] = record[3:]
+        elif op == "d":
+            entries.pop(username, None)
+        elif op == "u" and username in entries:
+            values = entries[username]
+            entries[username] = [values[0], record[3], values[2]]
+
+    def _run(self):
+        """
+        Writer loop: collects records, appends them to the journal and syncs once per batch.
+        """
+        running = True
+        while running:
+            batch = [self._records.get()]
+            while True:
+                try:
+                    batch.append(self._records.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                running = False
+                batch = [record for record in batch if record is not None]
+
+            if batch:
+                self._write_batch(batch)
+
+            if running:
+                # Let records pile up, so the next batch shares one fsync
+                time.sleep(self.flush_interval)
+
+        self._journal.close()
+        self._journal = None
+
+    def _write_batch(self, batch):
+        """
+        Appends a batch of records to the journal and takes a snapshot if the journal got too long.
+        """
+        self._journal.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in batch))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+        for record in batch:
+            self._apply(record)
+        self._journal_records += len(batch)
+
+        if self._journal_records >= self.snapshot_every:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """
+        Saves the current state as a snapshot and starts a new, empty journal.
+        """
+        snapshot = {
+            "queue": [[name, *values] for name, values in self._queue.items()],
+            "selected": [[name, *values] for name, values in self._selected.items()],
+        }
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+        # The snapshot contains everything journaled so far
+        if self._journal:
+            self._journal.close()
+            self._journal = open(self.journal_path, "w", encoding="utf-8")
+        else:
+            open(self.journal_path, "w", encoding="utf-8").close()
+        self._journal_records = 0
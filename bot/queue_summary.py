@@ -0,0 +1,45 @@
+from bot.queue_event import QueueEvent
+
+
+class QueueSummary:
+    """
+    Cached "next in queue" line for the !queue command.
+
+    The line is only rebuilt after a change touched the first entries of the queue,
+    changes further back only update the remaining count.
+    """
+    def __init__(self, queue_manager, size=9):
+        self.queue_manager = queue_manager
+        self.size = size
+        self._names = None
+        self._shown = 0
+        queue_manager.add_listener(self._on_queue_event)
+
+    def get(self):
+        """
+        Returns the comma separated names of the next viewers and how many more are queued.
+        """
+        with self.queue_manager.lock:
+            if self._names is None:
+                top = self.queue_manager.get_top(self.size)
+                self._names = ", ".join(entry.username for entry in top)
+                self._shown = len(top)
+            return self._names, self.queue_manager.get_queue_length() - self._shown
+
+    def close(self):
+        """
+        Stops listening to the queue manager.
+        """
+        self.queue_manager.remove_listener(self._on_queue_event)
+
+    def _on_queue_event(self, event):
+        """
+        Called by the queue manager under its lock.
+        """
+        if event.target != QueueEvent.QUEUE or event.kind == QueueEvent.CHANGED:
+            # Changed entries keep their position and name
+            return
+        if (event.kind == QueueEvent.RESET
+                or event.index < self.size
+                or (event.to_index is not None and event.to_index < self.size)):
+            self._names = None
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from bot.bot_twitch import TwitchBot
+
+logger = logging.getLogger(__name__)
+
+
+class BotSupervisor:
+    """
+    Runs the Twitch bot on one long-lived event loop and keeps it connected.
+
+    The bot is created once. TwitchIO reconnects dropped websockets by itself; the supervisor
+    watches the connection, reconnects the same bot instance if TwitchIO gives up (e.g. after a
+    failed login), refreshes the token when needed and retries with jittered exponential backoff
+    for as long as the application runs. The queues live outside the bot, so they keep working
+    while the bot is reconnecting.
+    """
+    INITIAL_DELAY = 1.0
+    MAX_DELAY = 120.0
+    # Seconds between two connection checks
+    HEALTH_CHECK_INTERVAL = 1.0
+    # Seconds TwitchIO gets to reconnect by itself before the supervisor steps in
+    RECONNECT_TIMEOUT = 30.0
+
+    def __init__(self, shards, config, token_manager):
+        """
+        shards: ChannelShard per channel name, the main channel first.
+        """
+        self.shards = shards
+        # The main channel's controller shows the connection status
+        self.controller = next(iter(shards.values())).controller
+        self.config = config
+        self.token_manager = token_manager
+
+        self.loop = asyncio.new_event_loop()
+        self.bot = None
+        self.reconnects = 0
+        # Seconds between losing the connection and being back in the channel
+        self.last_rejoin_time = None
+        self._disconnected_at = None
+        self._thread = None
+        self._stopping = threading.Event()
+        # Coroutine functions awaited on the event loop before it stops
+        self._shutdown_callbacks = []
+
+    def start(self):
+        """
+        Start the event loop and the bot in a daemon thread.
+        """
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add_shutdown_callback(self, callback):
+        """
+        Registers a coroutine function that is awaited on the bot's event loop during shutdown,
+        e.g. to close servers running on the same loop.
+        """
+        self._shutdown_callbacks.append(callback)
+
+    def run(self):
+        """
+        Run the event loop and the bot in the current thread until stop() is called.
+        """
+        try:
+            self._run()
+        except KeyboardInterrupt:
+            self._stopping.set()
+            self.loop.run_until_complete(self._close_bot())
+            self.loop.close()
+
+    def stop(self):
+        """
+        Disconnect the bot and stop the event loop. Can be called from any thread.
+        """
+        self._stopping.set()
+        if not self.loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self._supervise())
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _shutdown(self):
+        await self._close_bot()
+        self.loop.stop()
+
+    async def _close_bot(self):
+        for callback in self._shutdown_callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                logger.exception("Error during shutdown: %s", e)
+        if self.bot:
+            # Add joins that are still waiting for their batch
+            self.bot.join_ingest.flush()
+            await self.bot.chat.close()
+        if self.bot and self.bot._closing and not self.bot._closing.is_set():
+            await self.bot.close()
+        # Cancel the supervise loop and anything else still running on the loop
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _supervise(self):
+        """
+        Wait for a valid token, then keep the bot connected.
+        """
+        await self.loop.run_in_executor(None, self._wait_for_valid_token)
+        if self._stopping.is_set():
+            return
+
+        self.bot = TwitchBot(self.shards, self.config, self.token_manager)
+        self.bot.add_event(self._on_ready, "event_ready")
+
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                await self.bot.connect()
+                failures = 0
+                await self._watch_connection()
+            except Exception as e:
+                logger.error("Bot connection failed: %s", e)
+
+            failures += 1
+            self._mark_disconnected()
+            delay = self._backoff_delay(failures)
+            logger.info("Reconnecting in %.1f seconds...", delay, extra={"failures": failures})
+            self.controller.status_message.emit(f"Reconnecting in {delay:.0f}s...")
+            await asyncio.sleep(delay)
+
+            # Validate again, the connection may have failed because of the token
+            if await self.loop.run_in_executor(None, self._revalidate_token):
+                self.bot.update_token(self.config.twitch_oauth_token)
+
+    async def _watch_connection(self):
+        """
+        Return once the bot is closed or TwitchIO failed to reconnect in time.
+        """
+        while not self.bot._closing.is_set():
+            try:
+                await asyncio.wait_for(self.bot._closing.wait(), self.HEALTH_CHECK_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+            if self.bot._connection.is_alive:
+                continue
+            self._mark_disconnected()
+            if time.monotonic() - self._disconnected_at > self.RECONNECT_TIMEOUT:
+                logger.warning("Bot did not reconnect in time.")
+                await self.bot._connection._close()
+                return
+
+    async def _on_ready(self):
+        """
+        Called by TwitchIO after every successful (re)connect.
+        """
+        if self._disconnected_at is not None:
+            self.last_rejoin_time = time.monotonic() - self._disconnected_at
+            self.reconnects += 1
+            self._disconnected_at = None
+            logger.info("Bot rejoined after %.2f seconds.", self.last_rejoin_time,
+                        extra={"rejoin_time": self.last_rejoin_time, "reconnects": self.reconnects})
+
+    def _mark_disconnected(self):
+        if self._disconnected_at is None:
+            self._disconnected_at = time.monotonic()
+            self.bot.run_event("disconnect")
+
+    def _wait_for_valid_token(self):
+        """
+        Wait until a valid Twitch token is available.
+        The token manager validates the token once and refreshes it if needed.
+        """
+        while not self._stopping.is_set():
+            if self.token_manager.ensure_valid():
+                logger.info("Valid Twitch token found.")
+                self.controller.status_message.emit("Twitch authorized. Connecting...")
+                return
+            elif self.config.twitch_oauth_token:
+                logger.warning("Invalid Twitch token found.")
+                self.controller.status_message.emit("Twitch token invalid. Please authorize again.")
+            else:
+                logger.info("Waiting for Twitch token...")
+                self.controller.status_message.emit("Waiting for Twitch authorization...")
+            self._stopping.wait(2)
+
+    def _revalidate_token(self):
+        # Forget the cached expiry, so the token manager asks Twitch
+        self.token_manager.expires_at = 0
+        return self.token_manager.ensure_valid()
+
+    def _backoff_delay(self, failures):
+        # Exponential backoff with jitter, so reconnects don't happen in lockstep
+        delay = min(self.MAX_DELAY, self.INITIAL_DELAY * 2 ** (failures - 1))
+        return delay * random.uniform(0.5, 1.0)
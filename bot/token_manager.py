@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+
+from bot.metrics import TOKEN_REFRESHES, TOKEN_REFRESH_SECONDS
+from bot.twitch_http import get_twitch_http, TwitchHTTPError
+
+logger = logging.getLogger(__name__)
+
+
+class TokenManager:
+    """
+    Keeps the Twitch access token valid without waiting for the bot to fail.
+
+    The token is validated once against /oauth2/validate and its expiry is cached.
+    A background timer refreshes the token shortly before it expires and passes the
+    new token to all listeners, so a running bot can switch tokens without reconnecting.
+    The token is also re-validated every hour, as Twitch requires for chat bots.
+    """
+    # Refresh this many seconds before the token expires
+    REFRESH_MARGIN = 300
+    # Longest time between two validations
+    VALIDATE_INTERVAL = 3600
+    # Time until a failed refresh is tried again
+    RETRY_DELAY = 60
+
+    def __init__(self, config):
+        self.config = config
+        self.login = None
+        self.user_id = None
+        self.expires_at = 0
+        self._listeners = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """
+        Registers a callback that is called with the new token after every refresh.
+        Callbacks run on the timer thread.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        Unregisters a callback added with add_listener.
+        """
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def ensure_valid(self):
+        """
+        Makes sure the configured token is valid, refreshing it if needed.
+        Costs a single request when the token is still valid.
+        Returns True if a valid token is available, otherwise False.
+        """
+        token = self.config.twitch_oauth_token
+        if not token:
+            return False
+
+        if self.expires_at - self.REFRESH_MARGIN > time.time() and self.login:
+            return True
+
+        try:
+            status, data = get_twitch_http(self.config).validate_token(token)
+        except TwitchHTTPError as e:
+            logger.error("Error validating token: %s", e)
+            return False
+
+        if status == 200:
+            self._store_validation(data)
+            if self.expires_at - self.REFRESH_MARGIN <= time.time():
+                return self.refresh()
+            self._schedule()
+            return True
+
+        logger.info("Token is invalid. Refreshing token...")
+        return self.refresh()
+
+    def refresh(self):
+        """
+        Gets a new access token with the refresh token and notifies all listeners.
+        Returns True if the refresh was successful, otherwise False.
+        """
+        with self._lock:
+            refresh_token = self.config.twitch_refresh_token
+            if not refresh_token:
+                return False
+
+            started = time.perf_counter()
+            try:
+                _, data = get_twitch_http(self.config).refresh_token(refresh_token)
+            except TwitchHTTPError as e:
+                logger.error("Error refreshing token: %s", e)
+                TOKEN_REFRESHES.inc("error")
+                return False
+            finally:
+                TOKEN_REFRESH_SECONDS.observe(time.perf_counter() - started)
+
+            if "access_token" not in data:
+                logger.error("Failed to refresh token: %s", data)
+                TOKEN_REFRESHES.inc("rejected")
+                return False
+            TOKEN_REFRESHES.inc("success")
+
+            self.config.twitch_oauth_token = data["access_token"]
+            self.config.twitch_refresh_token = data.get("refresh_token", refresh_token)
+            self.config.save_config()
+            self._store_expiry(data)
+
+        logger.info("Token refresh successful!", extra={"expires_at": self.expires_at})
+        for callback in list(self._listeners):
+            callback(self.config.twitch_oauth_token)
+
+        # The login belongs to the account, so only validate again if it is still unknown
+        if not self.login:
+            return self.ensure_valid()
+        self._schedule()
+        return True
+
+    def stop(self):
+        """
+        Cancels the scheduled refresh.
+        """
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _store_validation(self, data):
+        self.login = data.get("login")
+        self.user_id = data.get("user_id")
+        self._store_expiry(data)
+
+    def _store_expiry(self, data):
+        # An expires_in of 0 means the token does not expire
+        expires_in = data.get("expires_in") or 0
+        self.expires_at = time.time() + expires_in if expires_in else float("inf")
+
+    def _schedule(self, delay=None):
+        """
+        Starts the timer for the next refresh or validation.
+        """
+        self.stop()
+        if delay is None:
+            delay = min(self.expires_at - self.REFRESH_MARGIN - time.time(), self.VALIDATE_INTERVAL)
+        self._timer = threading.Timer(max(delay, 0), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        # Runs on the timer thread, so an error must not end the refresh cycle
+        try:
+            if self.expires_at - self.REFRESH_MARGIN <= time.time():
+                success = self.refresh()
+            else:
+                # Forget the cached expiry so ensure_valid asks Twitch again
+                self.expires_at = 0
+                success = self.ensure_valid()
+        except Exception:
+            logger.exception("Error refreshing token")
+            success = False
+        if not success:
+            self._schedule(self.RETRY_DELAY)
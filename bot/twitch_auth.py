@@ -1,4 +1,4 @@
-import requests
+import logging
 import webbrowser
 import http.server
 import socketserver
@@ -7,14 +7,17 @@ from urllib.parse import urlparse, parse_qs
 from typing import Optional
 
 from helper.helper import show_popup
+from bot.twitch_http import get_twitch_http, TwitchHTTPError
+
+logger = logging.getLogger(__name__)
 
 class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     allow_reuse_address = True
 
 class TwitchAuthHandler:
     """
-    Handles Twitch authentication by starting a local server to capture the auth code,
-    exchanging it for tokens, and refreshing tokens when necessary.
+    Handles Twitch authentication by starting a local server to capture the auth code
+    and exchanging it for tokens. Refreshing is done by the TokenManager.
     """
     def __init__(self, config):
         self.config = config
@@ -29,9 +32,9 @@ class TwitchAuthHandler:
         Starts the Twitch authorization process by opening the auth URL,
         starting a local server to capture the response, and exchanging the auth code for tokens.
         """
-        print("Starting Twitch authorization...")
+        logger.info("Starting Twitch authorization...")
         auth_url = (
-            f"https://id.twitch.tv/oauth2/authorize?"
+            f"{self.config.twitch_id_base_url.rstrip('/')}/oauth2/authorize?"
             f"client_id={self.config.twitch_client_id}&"
             f"response_type=code&"
             f"redirect_uri={self.config.twitch_app_redirect_uri}&"
@@ -40,7 +43,7 @@ class TwitchAuthHandler:
         webbrowser.open(auth_url)
         self.start_local_server()
         
-        print("Waiting for Twitch authorization...")
+        logger.info("Waiting for Twitch authorization...")
         self.auth_event.wait()
         self.exchange_code_for_token()
         self.stop_server()
@@ -80,53 +83,22 @@ class TwitchAuthHandler:
         """
         Exchanges the captured authorization code for an access token and refresh token.
         """
-        url = "https://id.twitch.tv/oauth2/token"
-        data = {
-            "client_id": self.config.twitch_client_id,
-            "client_secret": self.config.twitch_client_secret,
-            "code": self.auth_code,
-            "grant_type": "authorization_code",
-            "redirect_uri": self.config.twitch_app_redirect_uri
-        }
-        response = requests.post(url, data=data)
-        token_data = response.json()
-        
+        try:
+            _, token_data = get_twitch_http(self.config).exchange_code(
+                self.auth_code, self.config.twitch_app_redirect_uri
+            )
+        except TwitchHTTPError as e:
+            token_data = {"error": str(e)}
+
         if "access_token" in token_data:
             self.oauth_token = token_data["access_token"]
             self.refresh_token = token_data["refresh_token"]
-            print("Twitch authentication successful!")
+            logger.info("Twitch authentication successful!")
             self.save_tokens()
         else:
             show_popup("error", "Error exchanging code for token",
                        "Error during token exchange:\n" + str(token_data))
-            print("Error exchanging code for token:", token_data)
-            exit(1)
-
-    def refresh_twitch_token(self):
-        """
-        Refreshes the access token using the current refresh token.
-        """
-        url = "https://id.twitch.tv/oauth2/token"
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": self.refresh_token,
-            "client_id": self.config.twitch_client_id,
-            "client_secret": self.config.twitch_client_secret
-        }
-        response = requests.post(url, data=data)
-        token_data = response.json()
-        
-        if "access_token" in token_data:
-            self.oauth_token = token_data["access_token"]
-            self.refresh_token = token_data.get("refresh_token", self.refresh_token)
-            self.save_tokens()
-            print("Token refresh successful!")
-            return self.oauth_token
-        else:
-            show_popup("error", "Error refreshing token",
-                       "Error during token refresh:\n" + str(token_data))
-            print("Failed to refresh token:", token_data)
-            exit(1)
+            logger.error("Error exchanging code for token: %s", token_data)
 
     def save_tokens(self):
         """
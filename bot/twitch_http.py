@@ -0,0 +1,159 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TwitchHTTPError(Exception):
+    """
+    Raised when a request to Twitch failed after all retries.
+    """
+
+
+class TwitchHTTPClient:
+    """
+    Shared HTTP client for the Twitch OAuth and Helix APIs.
+
+    Keeps connections alive in a pool, so repeated calls skip the TCP and TLS handshake.
+    Every request has a bounded timeout and is retried with exponential backoff on
+    connection errors, rate limits (429) and server errors (5xx).
+
+    All methods block. The bot's event loop calls them through run_in_executor.
+    The base URLs can be changed to run against a local stub server.
+    """
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, client_id="", client_secret="",
+                 id_base_url="https://id.twitch.tv", api_base_url="https://api.twitch.tv",
+                 timeout=5.0, retries=3, backoff=0.5, pool_size=10):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.id_base_url = id_base_url.rstrip("/")
+        self.api_base_url = api_base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    # OAuth
+
+    def exchange_code(self, code, redirect_uri):
+        """
+        Exchange an authorization code for tokens.
+        Returns (status, data).
+        """
+        return self.request("POST", self.id_base_url + "/oauth2/token", data={
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": redirect_uri
+        })
+
+    def refresh_token(self, refresh_token):
+        """
+        Get a new access token using a refresh token.
+        Returns (status, data).
+        """
+        return self.request("POST", self.id_base_url + "/oauth2/token", data=self._refresh_data(refresh_token))
+
+    def validate_token(self, token):
+        """
+        Validate an access token.
+        Returns (status, data), data contains "login" and "expires_in" for valid tokens.
+        """
+        return self.request("GET", self.id_base_url + "/oauth2/validate", headers=self._validate_headers(token))
+
+    # Helix
+
+    def helix(self, method, path, token, **kwargs):
+        """
+        Send a request to a Helix endpoint, e.g. helix("GET", "/users", token).
+        Returns (status, data).
+        """
+        headers = {**self._helix_headers(token), **kwargs.pop("headers", {})}
+        return self.request(method, self.api_base_url + "/helix" + path, headers=headers, **kwargs)
+
+    # Transport
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a blocking request with retries.
+        Returns (status, data) where data is the decoded JSON body or an empty dict.
+        Raises TwitchHTTPError if the request failed after all retries.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            else:
+                if response.status_code not in self.RETRY_STATUS or attempt == self.retries:
+                    return response.status_code, self._decode(response.json)
+                error = TwitchHTTPError(f"{method} {url} returned {response.status_code}")
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    time.sleep(min(int(retry_after), self.timeout))
+                    continue
+            if attempt < self.retries:
+                time.sleep(self._backoff_delay(attempt))
+        raise TwitchHTTPError(f"{method} {url} failed: {error}")
+
+    def close(self):
+        """
+        Close the session.
+        """
+        self._session.close()
+
+    def _backoff_delay(self, attempt):
+        # Exponential backoff with jitter, so clients don't retry in lockstep
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    def _refresh_data(self, refresh_token):
+        return {
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret
+        }
+
+    def _validate_headers(self, token):
+        return {"Authorization": f"OAuth {token}"}
+
+    def _helix_headers(self, token):
+        return {"Authorization": f"Bearer {token}", "Client-Id": self.client_id}
+
+    @staticmethod
+    def _decode(read_json):
+        try:
+            data = read_json()
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_twitch_http(config):
+    """
+    Return the shared Twitch HTTP client, created from the config on first use.
+    The client id, secret and base URLs are refreshed from the config on every call.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = TwitchHTTPClient()
+        _shared_client.client_id = config.twitch_client_id
+        _shared_client.client_secret = config.twitch_client_secret
+        _shared_client.id_base_url = config.twitch_id_base_url.rstrip("/")
+        _shared_client.api_base_url = config.twitch_api_base_url.rstrip("/")
+        return _shared_client
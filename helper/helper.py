@@ -1,29 +1,28 @@
-import requests
-import tkinter as tk
-from tkinter import messagebox
+import logging
 import sys
+import threading
 
+logger = logging.getLogger(__name__)
+
+# In headless mode errors are logged instead of shown in a popup
+_headless = False
 
-def can_connect_with_token(token, config):
-    """
-    Checks if a connection to Twitch can be established using the provided token.
 
-    Returns True if the token is valid (HTTP status 200), otherwise False.
+def set_headless(headless):
     """
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Client-Id": config.twitch_client_id,
-    }
-    try:
-        response = requests.get("https://api.twitch.tv/helix/users", headers=headers, timeout=5)
-        return response.status_code == 200
-    except Exception as e:
-        print("Error testing token connectivity:", e)
-        return False
+    Enable or disable headless mode. In headless mode show_popup logs the message
+    and tkinter is never loaded.
+    """
+    global _headless
+    _headless = headless
+
 
 def show_popup(type, title, message):
     """
-    Creates a popup message window using tkinter.
+    Creates a popup message window using tkinter, then exits.
+    Only exits on the main thread: on other threads, e.g. the token refresh timer, SystemExit
+    would only end that thread while the process keeps running without it, so the
+    caller continues instead.
     
     Args
     - type (str): Type of popup ('info', 'warning', or 'error').
@@ -32,6 +31,23 @@ def show_popup(type, title, message):
     
     Raises ValueError If an invalid popup type is provided.
     """
+    log_levels = {
+        "info": logging.INFO,
+        "warning": logging.WARNING,
+        "error": logging.ERROR
+    }
+    if type not in log_levels:
+        raise ValueError("Invalid popup type. Use 'info', 'warning', or 'error'.")
+
+    if _headless:
+        logger.log(log_levels[type], "%s: %s", title, message)
+        _exit_on_main_thread()
+        return
+
+    # Imported here, so tkinter is only loaded when a popup is actually shown
+    import tkinter as tk
+    from tkinter import messagebox
+
     root = tk.Tk()
     root.withdraw()
 
@@ -40,11 +56,15 @@ def show_popup(type, title, message):
         "warning": messagebox.showwarning,
         "error": messagebox.showerror
     }
-    
-    if type in popup_types:
-        popup_types[type](title, message)
-    else:
-        raise ValueError("Invalid popup type. Use 'info', 'warning', or 'error'.")
+    popup_types[type](title, message)
     
     root.destroy()
-    sys.exit(1)
+    _exit_on_main_thread()
+
+
+def _exit_on_main_thread():
+    """
+    Exit the application if called from the main thread, otherwise return.
+    """
+    if threading.current_thread() is threading.main_thread():
+        sys.exit(1)
@@ -0,0 +1,94 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Attributes every LogRecord has, everything else was passed with extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line with time, level, logger and message.
+    Fields passed with extra={...} are added to the object, so records can be filtered by them.
+    """
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Puts records into the queue with the message and the traceback already rendered,
+    but without applying a format, so every sink can use its own.
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(config):
+    """
+    Route all logging through a queue, so the bot and UI threads never wait for console
+    or file I/O. A background thread writes the records to the console and to a rotating
+    log file in the data directory.
+
+    Config keys:
+    - log_level:        level of all loggers, e.g. "INFO" (DEBUG shows the per-join details)
+    - log_levels:       levels per module, e.g. {"twitchio": "WARNING", "bot.chat_sender": "DEBUG"}
+    - log_format:       "text" or "json"
+    - log_file:         file name in the data directory, empty to disable the file
+    - log_max_bytes / log_backup_count: size and number of the rotated files
+    Returns the QueueListener, which is stopped at exit.
+    """
+    formatter = JsonFormatter() if config.log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    # Bundled executables without a console have no stderr
+    if sys.stderr is not None:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    if config.log_file:
+        handlers.append(RotatingFileHandler(
+            os.path.join(config.get_data_dir(), config.log_file),
+            maxBytes=config.log_max_bytes,
+            backupCount=config.log_backup_count,
+            encoding="utf-8",
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(config.log_level.upper())
+    for name, level in config.log_levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+    return listener
@@ -1,93 +1,135 @@
+import logging
+import secrets
+import signal
 import sys
-import threading
-import time
-import asyncio
-from PyQt6.QtWidgets import QApplication
-
-from ui.ui import UI
-from ui.controller import QueueController
-from bot.bot_twitch import TwitchBot
-from bot.queue_manager import QueueManager
-from bot.twitch_auth import TwitchAuthHandler
+
+from bot import metrics
+from bot.supervisor import BotSupervisor
+from bot.channel_shard import create_shards
+from bot.token_manager import TokenManager
 from bot.config import Config
-from helper.helper import show_popup, can_connect_with_token
+from helper.logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
 
-def wait_for_valid_token(controller, config):
+
+def start_control_api(config, shards, supervisor):
     """
-    Wait until a valid Twitch token is available.
-    If the token is invalid, attempt to refresh it.
+    Start the local control API on the bot's event loop, if it is enabled.
+    The main channel is served at the root, additional channels under /channels/<name>/.
+    A token is generated on the first start and saved to the config.
     """
-    while True:
-        token = config.twitch_oauth_token
-        if token:
-            if can_connect_with_token(token, config):
-                print("Valid Twitch token found.")
-                controller.status_message.emit("Twitch authorized. Connecting...")
-                return
-            else:
-                print("Invalid Twitch token found. Refreshing token...")
-                controller.status_message.emit("Refreshing Twitch token...")
-                TwitchAuthHandler(config).refresh_twitch_token()
-        else:
-            print("Waiting for Twitch token...")
-            controller.status_message.emit("Waiting for Twitch authorization...")
-        time.sleep(2)
-
-def start_bot_loop(controller, shared_queue_manager, config):
+    if not config.api_enabled:
+        return
+    from bot.control_api import ControlAPI
+    from bot.overlay import OverlayFeed
+
+    if not config.api_token:
+        config.api_token = secrets.token_urlsafe(24)
+        config.save_config()
+        logger.info("Generated a control API token, see api_token in config.json")
+
+    apis = []
+    for shard in shards.values():
+        api = ControlAPI(shard.controller, shard.queue_manager, config.api_host, config.api_port,
+                         config.api_token, config.api_allowed_origins)
+        if config.overlay_enabled:
+            OverlayFeed(api)
+        apis.append(api)
+    main_api = apis[0]
+    for channel, api in zip(list(shards)[1:], apis[1:]):
+        main_api.add_channel(channel, api)
+    if config.metrics_enabled:
+        main_api.serve_metrics()
+    main_api.start(supervisor.loop)
+    supervisor.add_shutdown_callback(main_api.close)
+
+
+def run_ui(config, shards):
     """
-    Wait for a valid token, then repeatedly run the Twitch bot.
-    The bot is restarted up to three times if a token refresh occurs.
+    Run the bot in a daemon thread and the Qt UI on the main thread.
+    Returns the exit code of the UI.
     """
-    # Wait for a valid token before starting the bot
-    wait_for_valid_token(controller, config)
-
-    restart_count = 0
-    while restart_count < 3:
-        # Create and set a new event loop for this thread so TwitchIO can use it.
-        asyncio.set_event_loop(asyncio.new_event_loop())
-        
-        # Create and run a new Twitch bot instance
-        bot_instance = TwitchBot(controller, shared_queue_manager, config) 
-        bot_thread = threading.Thread(target=bot_instance.run)
-        bot_thread.start()
-        bot_thread.join()
-        
-        # Restart the bot if the token was refreshed, otherwise exit loop.
-        if bot_instance.should_restart:
-            print("Bot instance ended due to token refresh. Restarting bot...")
-            restart_count += 1
-            time.sleep(2)
-            continue
-        else:
-            print("Bot terminated normally. Exiting restart loop.")
-            break
-    else:
-        print("Maximum bot restarts reached. Please restart the application manually.")
-        show_popup(
-            "warning",
-            "Restart needed",
-            ("Tokens have been refreshed but the bot failed to restart.\n"
-             "Please restart the application.\n\n"
-             "If this error continues, check your config.json for any incorrect values.")
-        )
+    # Qt is only loaded when the UI is used
+    from PyQt6.QtWidgets import QApplication
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    from ui.ui import UI
+    from ui.controller import QueueController
 
-    config = Config()
+    app = QApplication(sys.argv)
+    for shard in shards.values():
+        shard.controller = QueueController(shard.queue_manager, shard.history, config.ui_max_refresh_rate)
 
-    # Initialize shared queue manager and controller
-    shared_queue_manager = QueueManager(config)
-    controller = QueueController(shared_queue_manager)
-    
     # Create and display the main UI
-    ui = UI(controller, config)
-    
-    # Start the Twitch bot loop in a separate daemon thread
-    bot_loop_thread = threading.Thread(
-        target=start_bot_loop, args=(controller, shared_queue_manager, config), daemon=True
-    )
-    bot_loop_thread.start()
-    
+    ui = UI(shards, config)
+
+    # Run the Twitch bot on its own event loop in a daemon thread
+    token_manager = TokenManager(config)
+    supervisor = BotSupervisor(shards, config, token_manager)
+    start_control_api(config, shards, supervisor)
+    supervisor.start()
+
     ui.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    exit_code = app.exec()
+    supervisor.stop()
+    token_manager.stop()
+    return exit_code
+
+
+def run_headless(config, shards):
+    """
+    Run the bot on the main thread without a UI until SIGINT or SIGTERM.
+    Returns the exit code.
+    """
+    from bot.headless_controller import HeadlessController
+
+    for shard in shards.values():
+        shard.controller = HeadlessController(shard.queue_manager, shard.history, shard.channel)
+    token_manager = TokenManager(config)
+    supervisor = BotSupervisor(shards, config, token_manager)
+    start_control_api(config, shards, supervisor)
+
+    if not config.twitch_oauth_token:
+        logger.warning("No Twitch token configured. Authorize once with the UI before running headless.")
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            supervisor.loop.add_signal_handler(sig, supervisor.stop)
+        except (NotImplementedError, RuntimeError):
+            # Not supported on Windows, Ctrl+C raises KeyboardInterrupt instead
+            pass
+
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        pass
+    supervisor.stop()
+    token_manager.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    headless = "--headless" in sys.argv[1:]
+    if headless:
+        from helper.helper import set_headless
+
+        set_headless(True)
+
+    config = Config()
+    setup_logging(config)
+    if config.metrics_enabled:
+        metrics.enable()
+
+    # One independent queue per channel
+    shards = create_shards(config)
+    for shard in shards.values():
+        shard.restore()
+
+    if headless:
+        exit_code = run_headless(config, shards)
+    else:
+        exit_code = run_ui(config, shards)
+
+    for shard in shards.values():
+        shard.close()
+    sys.exit(exit_code)
@@ -0,0 +1,59 @@
+import asyncio
+
+from bot.chat_sender import ChatSender
+
+
+class FakeChannel:
+    def __init__(self, name="channel", log=None):
+        self.name = name
+        self.sent = []
+        # Shared by several channels to record the order across channels
+        self.log = log if log is not None else []
+
+    async def send(self, text):
+        self.sent.append(text)
+        self.log.append(text)
+
+
+def test_keyed_reply_replaces_the_queued_one():
+    async def run():
+        chat = ChatSender(rate_limit=1000, per_seconds=1)
+        channel = FakeChannel()
+        chat.send(channel, "@a, you are #5", key=("a", "position"))
+        chat.send(channel, "@b, you are #6", key=("b", "position"))
+        chat.send(channel, "@a, you are #4", key=("a", "position"))
+        await asyncio.sleep(0.05)
+        await chat.close()
+        return channel.sent
+    assert asyncio.run(run()) == ["@a, you are #4", "@b, you are #6"]
+
+
+def test_stale_routine_messages_are_dropped():
+    async def run():
+        chat = ChatSender(rate_limit=1000, per_seconds=1, max_age=0)
+        channel = FakeChannel()
+        chat.send(channel, "routine")
+        chat.send(channel, "moderator", ChatSender.PRIORITY_HIGH)
+        await asyncio.sleep(0.05)
+        await chat.close()
+        return channel.sent, chat.dropped
+    assert asyncio.run(run()) == (["moderator"], 1)
+
+
+def test_flooded_channel_does_not_starve_another():
+    async def run():
+        chat = ChatSender(rate_limit=1000, per_seconds=1, max_queue=10)
+        order = []
+        busy, quiet = FakeChannel("busy", order), FakeChannel("quiet", order)
+        for i in range(20):
+            chat.send(busy, f"busy {i}")
+        accepted = chat.send(quiet, "quiet")
+        await asyncio.sleep(0.05)
+        await chat.close()
+        return accepted, order, chat.dropped
+    accepted, order, dropped = asyncio.run(run())
+    assert accepted
+    # The busy channel only lost messages beyond its own limit, the quiet one is served second
+    assert dropped == 10
+    assert order[:2] == ["busy 0", "quiet"]
+    assert len(order) == 11
@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.control_api import ControlAPI
+from bot.queue_manager import QueueManager
+
+
+def make_api(token="secret", allowed_origins=()):
+    controller = SimpleNamespace(queue_closed=False)
+    queue_manager = QueueManager(SimpleNamespace(sorting_option=0))
+    return ControlAPI(controller, queue_manager, token=token, allowed_origins=allowed_origins)
+
+
+def get_statuses(api, requests):
+    """
+    Sends (path, headers) GET requests to the API and returns the response statuses.
+    """
+    async def send():
+        async with TestClient(TestServer(api.app)) as client:
+            statuses = []
+            for path, headers in requests:
+                async with client.get(path, headers=headers) as response:
+                    statuses.append(response.status)
+            return statuses
+    return asyncio.run(send())
+
+
+def test_requests_need_the_token():
+    statuses = get_statuses(make_api(), [
+        ("/api/state", {}),
+        ("/api/state?token=wrong", {}),
+        ("/api/state?token=secret", {}),
+        ("/api/state", {"Authorization": "Bearer secret"}),
+    ])
+    assert statuses == [401, 401, 200, 200]
+
+
+def test_without_token_all_requests_are_rejected():
+    assert get_statuses(make_api(token=""), [("/api/state?token=", {})]) == [401]
+
+
+def test_foreign_origins_are_rejected():
+    auth = {"Authorization": "Bearer secret"}
+    handshake = {"Connection": "Upgrade", "Upgrade": "websocket", "Sec-WebSocket-Version": "13",
+                 "Sec-WebSocket-Key": "dGhlIHNhbXBsZSBub25jZQ=="}
+    statuses = get_statuses(make_api(allowed_origins=["http://localhost:3000"]), [
+        ("/api/state", {**auth, "Origin": "https://example.com"}),
+        ("/api/events", {**auth, **handshake, "Origin": "https://example.com"}),
+        ("/api/state", {**auth, "Origin": "http://localhost:3000"}),
+    ])
+    assert statuses == [403, 403, 200]
@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.join_ingest import JoinIngest, _Batch
+from bot.queue_manager import QueueManager
+
+
+class FakeChat:
+    def __init__(self):
+        self.sent = []
+        self.confirmed = []
+
+    def send(self, channel, text, priority=None, key=None):
+        self.sent.append(text)
+
+    def confirm_many(self, channel, usernames, action):
+        self.confirmed.extend((username, action) for username in usernames)
+
+
+def make_shard():
+    queue_manager = QueueManager(SimpleNamespace(sorting_option=0))
+    controller = SimpleNamespace(get_queue_counts=lambda usernames: dict.fromkeys(usernames, 0),
+                                 update_ui=lambda: None, queue_closed=False)
+    return SimpleNamespace(channel="channel", queue_manager=queue_manager, controller=controller)
+
+
+def submit_and_flush(ingest, shard, usernames, before_flush):
+    """
+    Submits join requests, runs before_flush while they wait and then adds the batch.
+    """
+    async def run():
+        for join_time, username in enumerate(usernames):
+            ingest.submit(shard, None, username, 0, float(join_time))
+        before_flush()
+        ingest.flush()
+    asyncio.run(run())
+
+
+def test_replies_match_the_state_of_users_that_were_not_added():
+    shard = make_shard()
+    queue_manager = shard.queue_manager
+    queue_manager.add_user("queued", 0, 0, 1.0)
+    queue_manager.add_user("selected", 0, 0, 2.0)
+    queue_manager.move_to_selected("selected")
+
+    chat = FakeChat()
+    batch = _Batch(shard, channel=None)
+    batch.requests = {"new": (0, 3.0), "queued": (0, 4.0), "selected": (0, 5.0)}
+    JoinIngest(chat)._add(batch)
+
+    assert chat.confirmed == [("new", "joined the queue")]
+    assert chat.sent == ["@queued, you're already in the queue!",
+                         "@selected, You can't join right now! You are up!"]
+
+
+def test_waiting_requests_are_not_added_after_the_queue_was_closed():
+    shard = make_shard()
+    chat = FakeChat()
+
+    def close():
+        shard.controller.queue_closed = True
+
+    submit_and_flush(JoinIngest(chat), shard, ["a", "b"], close)
+    assert shard.queue_manager.get_queue_length() == 0
+    assert chat.confirmed == [("a", "couldn't join, the queue is closed"),
+                              ("b", "couldn't join, the queue is closed")]
+
+
+def test_leave_cancels_a_waiting_request():
+    shard = make_shard()
+    ingest = JoinIngest(FakeChat())
+    cancelled = []
+
+    def leave():
+        cancelled.append(ingest.cancel(shard, "a"))
+        cancelled.append(ingest.cancel(shard, "unknown"))
+
+    submit_and_flush(ingest, shard, ["a", "b"], leave)
+    assert cancelled == [True, False]
+    assert [entry.username for entry in shard.queue_manager.get_queue()] == ["b"]
@@ -0,0 +1,73 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from bot.queue_manager import QueueManager, _OrderedIndex
+
+
+def make_queue_manager(sorting_option=0):
+    queue_manager = QueueManager(SimpleNamespace(sorting_option=sorting_option))
+    events = []
+    queue_manager.add_listener(events.append)
+    return queue_manager, events
+
+
+def random_users(prefix, count, rng):
+    return [(f"{prefix}{i}", rng.randint(0, 3), rng.randint(0, 5), rng.uniform(0, 1000)) for i in range(count)]
+
+
+@pytest.mark.parametrize("queued, batch", [
+    (0, 100),      # empty queue, merged
+    (300, 100),    # batch is at least 1 / MERGE_RATIO of the queue, merged
+    (5000, 100),   # inserted one by one
+])
+def test_add_users_keeps_order_and_reports_positions(queued, batch):
+    rng = random.Random(queued)
+    queue_manager, events = make_queue_manager()
+    queue_manager.add_users(random_users("q", queued, rng))
+    events.clear()
+
+    users = random_users("b", batch, rng)
+    added = queue_manager.add_users(users)
+
+    queue = queue_manager.get_queue()
+    assert sorted(added) == sorted(username for username, *_ in users)
+    assert list(queue) == sorted(queue, key=QueueManager.SORT_KEYS[0])
+    # Events carry the final positions in ascending order
+    positions = [event.index for event in events]
+    assert positions == sorted(positions)
+    assert [queue[event.index] for event in events] == [event.entry for event in events]
+
+
+def test_merge_path_is_used_for_large_batches(monkeypatch):
+    calls = []
+    original = _OrderedIndex._build
+
+    def build(self, entries):
+        calls.append(len(entries))
+        original(self, entries)
+
+    monkeypatch.setattr(_OrderedIndex, "_build", build)
+    queue_manager, _ = make_queue_manager()
+    rng = random.Random(1)
+    queue_manager.add_users(random_users("q", 200, rng))
+    calls.clear()
+
+    queue_manager.add_users(random_users("b", 100, rng))
+    assert calls == [300]
+
+
+def test_sort_option_change_rebuilds_the_ordering():
+    queue_manager, _ = make_queue_manager(sorting_option=3)
+    rng = random.Random(2)
+    queue_manager.add_users(random_users("q", 3000, rng))
+    for option in (0, 1, 2, 3):
+        queue_manager.config.sorting_option = option
+        queue_manager.sort_queue()
+        queue_manager.update_times_queued("q5", 9)
+        queue_manager.remove_from_queue("q7" if option == 0 else f"q{10 + option}")
+        queue = queue_manager.get_queue()
+        assert list(queue) == sorted(queue, key=QueueManager.SORT_KEYS[option])
+        assert [queue_manager.rank_of(entry.username) for entry in queue] == list(range(len(queue)))
+        assert [queue_manager.user_at(rank) for rank in range(len(queue))] == list(queue)
@@ -0,0 +1,33 @@
+from bot.queue_entry import QueueEntry
+from bot.queue_event import QueueEvent
+from bot.queue_store import QueueStore
+
+
+def add_record(username, join_us):
+    entry = QueueEntry.from_join_us(username, 1, 0, join_us)
+    return QueueEvent(QueueEvent.INSERTED, QueueEvent.QUEUE, 0, entry=entry)
+
+
+def test_load_cuts_off_incomplete_last_line(tmp_path):
+    store = QueueStore(tmp_path, flush_interval=0)
+    store.start()
+    store._on_queue_event(add_record("alice", 1))
+    store.close()
+
+    # Crash in the middle of writing the next record
+    with open(store.journal_path, "a", encoding="utf-8") as f:
+        f.write('["a","q","bo')
+
+    store = QueueStore(tmp_path, flush_interval=0)
+    queue_entries, _ = store.load()
+    assert [entry.username for entry in queue_entries] == ["alice"]
+    with open(store.journal_path, "rb") as f:
+        assert f.read().endswith(b"\n")
+
+    # Records written after the recovery must survive the next load
+    store.start()
+    store._on_queue_event(add_record("carol", 2))
+    store.close()
+
+    queue_entries, _ = QueueStore(tmp_path).load()
+    assert [entry.username for entry in queue_entries] == ["alice", "carol"]
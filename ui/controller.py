@@ -1,27 +1,118 @@
-from PyQt6.QtCore import QObject, pyqtSignal
+import threading
+
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+from bot.metrics import UI_REFRESH_SECONDS
+from bot.queue_event import QueueEvent
 
 class QueueController(QObject):
     # Signals for UI updates
+    # Full snapshots, used to resync the views
     queue_updated = pyqtSignal(list)
     selected_updated = pyqtSignal(list)
+    # Fine-grained changes: target list ("queue" or "selected"), index(es) and entry
+    entry_inserted = pyqtSignal(str, int, object)
+    entry_removed = pyqtSignal(str, int)
+    entry_moved = pyqtSignal(str, int, int, object)
+    entry_changed = pyqtSignal(str, int, object)
     connection_status = pyqtSignal(bool)
+    queue_closed_changed = pyqtSignal(bool)
     status_message = pyqtSignal(str)
+    # Internal signal to start the refresh timer on the controller's thread
+    _refresh_requested = pyqtSignal()
 
-    def __init__(self, queue_manager):
+    # Above this many pending changes a full snapshot is cheaper than single-row updates
+    RESYNC_THRESHOLD = 500
+
+    def __init__(self, queue_manager, history, max_refresh_rate=30):
         """
         Initialize the controller with a shared queue manager.
+        history: HistoryStore keeping the times queued counters.
+        max_refresh_rate: maximum number of UI refreshes per second.
         """
         super().__init__()
         self.queue_manager = queue_manager
-        self.queue_count = {}
+        self.history = history
         self.queue_closed = False
 
+        # Queue events collected since the last refresh
+        self._pending_events = []
+        self._pending_lock = threading.RLock()
+        self.queue_manager.add_listener(self._on_queue_event)
+
+        # Refresh scheduling: changes are flushed at most once per interval
+        self._dirty = False
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self.flush_ui)
+        self.set_max_refresh_rate(max_refresh_rate)
+        self._refresh_requested.connect(self._schedule_refresh, Qt.ConnectionType.QueuedConnection)
+
+    def set_max_refresh_rate(self, max_refresh_rate):
+        """
+        Set the maximum number of UI refreshes per second.
+        The refresh interval is also the longest time a change waits before it is shown.
+        """
+        self._refresh_timer.setInterval(max(1, int(1000 / max(1, max_refresh_rate))))
+
     def update_ui(self):
         """
-        Emit signals to update both the queue and the selected lists in the UI.
+        Mark the UI as outdated. Can be called from any thread.
+        All changes up to the next refresh are shown with a single refresh.
+        """
+        with self._pending_lock:
+            if self._dirty:
+                return
+            self._dirty = True
+        self._refresh_requested.emit()
+
+    @UI_REFRESH_SECONDS.time("flush")
+    def flush_ui(self):
+        """
+        Emit the changes made since the last refresh as fine-grained signals.
+        A reset of the queue order or a large burst of changes is sent as a full snapshot instead.
+        Runs on the UI thread when the refresh timer fires.
+        """
+        # Taking the queue manager lock first keeps snapshots and pending events consistent
+        with self.queue_manager.lock, self._pending_lock:
+            self._dirty = False
+            events, self._pending_events = self._pending_events, []
+            if len(events) > self.RESYNC_THRESHOLD:
+                queue = self.queue_manager.get_queue()
+                selected = self.queue_manager.get_selected()
+
+        # Emitting happens outside the locks, so the bot thread is never held up by the UI
+        if len(events) > self.RESYNC_THRESHOLD:
+            self.queue_updated.emit(list(queue))
+            self.selected_updated.emit(list(selected))
+            return
+
+        for event in events:
+            if event.kind == QueueEvent.INSERTED:
+                self.entry_inserted.emit(event.target, event.index, event.entry)
+            elif event.kind == QueueEvent.REMOVED:
+                self.entry_removed.emit(event.target, event.index)
+            elif event.kind == QueueEvent.MOVED:
+                self.entry_moved.emit(event.target, event.index, event.to_index, event.entry)
+            elif event.kind == QueueEvent.CHANGED:
+                self.entry_changed.emit(event.target, event.index, event.entry)
+            elif event.kind == QueueEvent.RESET and event.target == QueueEvent.QUEUE:
+                self.queue_updated.emit(list(event.entries))
+            elif event.kind == QueueEvent.RESET:
+                self.selected_updated.emit(list(event.entries))
+
+    @UI_REFRESH_SECONDS.time("resync")
+    def resync_ui(self):
+        """
+        Emit full snapshots of both the queue and the selected lists.
+        Should be called from the UI thread.
         """
-        self.queue_updated.emit(self.queue_manager.get_queue())
-        self.selected_updated.emit(self.queue_manager.get_selected())
+        with self.queue_manager.lock, self._pending_lock:
+            self._pending_events = []
+            queue = self.queue_manager.get_queue()
+            selected = self.queue_manager.get_selected()
+        self.queue_updated.emit(list(queue))
+        self.selected_updated.emit(list(selected))
 
     def update_selected(self, selected):
         """
@@ -32,15 +123,40 @@ class QueueController(QObject):
     def increase_queue_count(self, name):
         """
         Increase the count of how many times a user has joined the queue.
+        Moves the user to their new position if they are still queued.
         """
-        self.queue_count[name] = self.queue_count.get(name, 0) + 1
+        count = self.history.increase_queue_count(name)
+        self.queue_manager.update_times_queued(name, count)
 
     def get_queue_count(self, name):
         """
         Return the number of times a user has joined the queue (default is 0).
         """
-        return self.queue_count.get(name, 0)
-    
+        return self.history.get_queue_count(name)
+
+    def get_queue_counts(self, names):
+        """
+        Return the number of times several users have joined the queue, as a dict.
+        """
+        return self.history.get_queue_counts(names)
+
     def set_queue_closed(self, closed: bool):
-        """Called by the UI toggle to open/close the queue."""
+        """Called by the UI toggle or the control API to open/close the queue."""
+        if closed == self.queue_closed:
+            return
         self.queue_closed = closed
+        self.queue_closed_changed.emit(closed)
+
+    def _schedule_refresh(self):
+        """
+        Start the refresh timer unless a refresh is already scheduled.
+        """
+        if not self._refresh_timer.isActive():
+            self._refresh_timer.start()
+
+    def _on_queue_event(self, event):
+        """
+        Collect queue events until the next refresh.
+        """
+        with self._pending_lock:
+            self._pending_events.append(event)
@@ -1,3 +1,4 @@
+import logging
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QLineEdit, QComboBox, QFrame, QSizePolicy
@@ -5,6 +6,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QIcon, QAction
 import functools, os
 
+logger = logging.getLogger(__name__)
+
 class OptionsWindow(QDialog):
     def __init__(self, config, controller, parent=None):
         super().__init__(parent)
@@ -80,7 +83,7 @@ class OptionsWindow(QDialog):
             "Time joined"
         ])
         self.sort_combo.setFixedWidth(300)
-        self.sort_combo.setCurrentIndex(self.config.sorting_option or 0)
+        self.sort_combo.setCurrentIndex(self.controller.queue_manager.config.sorting_option or 0)
         sort_layout.addWidget(sort_label)
         sort_layout.addStretch()
         sort_layout.addWidget(self.sort_combo)
@@ -152,7 +155,8 @@ class OptionsWindow(QDialog):
         """Updated the config class with new values and saves them to the config file"""
         # Update Twitch channel
         self.config.twitch_channel = self.twitch_channel_input.text()
-        self.config.sorting_option = self.sort_combo.currentIndex()
+        # The sort option belongs to the channel shown in the main window
+        self.controller.queue_manager.config.sorting_option = self.sort_combo.currentIndex()
 
         # Update twitch credentials
         for label, line_edit in self.credentials.items():
@@ -171,7 +175,7 @@ class OptionsWindow(QDialog):
         Initiate Twitch authorization.
         """
         if not self.validate_required_fields():
-            print("Missing required fields. Please fill them in before authorizing.")
+            logger.warning("Missing required fields. Please fill them in before authorizing.")
             return
 
         import threading
@@ -221,10 +225,10 @@ class OptionsWindow(QDialog):
         self.twitch_channel_input.setText(self.config.twitch_channel or "")
 
         # Update Sort Option
-        print("Current index before: ", self.sort_combo.currentIndex())
-        print("Saved index: ", self.config.sorting_option)
-        self.sort_combo.setCurrentIndex(self.config.sorting_option or 0)
-        print("Current index after: ", self.sort_combo.currentIndex())
+        logger.debug("Current index before: %s", self.sort_combo.currentIndex())
+        logger.debug("Saved index: %s", self.controller.queue_manager.config.sorting_option)
+        self.sort_combo.setCurrentIndex(self.controller.queue_manager.config.sorting_option or 0)
+        logger.debug("Current index after: %s", self.sort_combo.currentIndex())
 
         # Update Credentials
         for label_text, line_edit in self.credentials.items():
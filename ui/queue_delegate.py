@@ -0,0 +1,193 @@
+from PyQt6.QtCore import Qt, QEvent, QRect, QSize, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QPainter
+from PyQt6.QtWidgets import QStyledItemDelegate, QToolTip
+
+from ui.queue_model import QueueListModel
+
+
+class QueueItemDelegate(QStyledItemDelegate):
+    """
+    Paints a queue row with its name, details and buttons.
+    Buttons are only painted, clicks are resolved by hit-testing the button areas.
+    """
+    # Emitted with the button action and the username of the row
+    button_clicked = pyqtSignal(str, str)
+
+    ROW_HEIGHT = 56
+    BUTTON_SIZE = 40
+    BUTTON_SPACING = 6
+    MARGIN = 10
+    DETAILS_SPACING = 15
+
+    # Colors matching the UI stylesheet
+    ROW_COLOR = QColor("#40444b")
+    ROW_BORDER_COLOR = QColor("#3a3a3c")
+    NAME_COLOR = QColor("#FFFFFF")
+    DETAILS_COLOR = QColor("#939393")
+    BUTTON_COLOR = QColor("#5865f2")
+    BUTTON_HOVER_COLOR = QColor("#4752c4")
+    BUTTON_PRESSED_COLOR = QColor("#3b43a1")
+    BUTTON_TEXT_COLOR = QColor("#E9E9E9")
+
+    def __init__(self, buttons, show_details=False, parent=None):
+        """
+        buttons: list of (action, text, tooltip) tuples, painted from left to right.
+        show_details: whether to paint the sub tier and times queued of an entry.
+        """
+        super().__init__(parent)
+        self.buttons = buttons
+        self.show_details = show_details
+        # (username, action) of the button under the cursor and the button being pressed.
+        # Rows are identified by username, as the row of a user changes when the list changes
+        # between press and release.
+        self._hovered = None
+        self._pressed = None
+        if parent is not None:
+            parent.viewport().installEventFilter(self)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter: QPainter, option, index):
+        entry = index.data(QueueListModel.EntryRole)
+        if entry is None:
+            return
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # Row background
+        row_rect = option.rect.adjusted(2, 2, -2, -2)
+        painter.setPen(self.ROW_BORDER_COLOR)
+        painter.setBrush(self.ROW_COLOR)
+        painter.drawRoundedRect(row_rect, 6, 6)
+
+        button_rects = self._button_rects(option.rect)
+        text_right = button_rects[0][1].left() - self.DETAILS_SPACING if button_rects else row_rect.right()
+
+        # Name
+        name_font = QFont(option.font)
+        name_font.setPixelSize(16)
+        name_font.setBold(True)
+        painter.setFont(name_font)
+        painter.setPen(self.NAME_COLOR)
+        name_rect = QRect(row_rect.left() + self.MARGIN, row_rect.top(),
+                          text_right - row_rect.left() - self.MARGIN, row_rect.height())
+        painter.drawText(name_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, entry.username)
+
+        # Details
+        if self.show_details:
+            details_font = QFont(option.font)
+            details_font.setPixelSize(14)
+            painter.setFont(details_font)
+            painter.setPen(self.DETAILS_COLOR)
+            painter.drawText(name_rect, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                             f"Tier {entry.sub_tier} | Queued: {entry.times_queued}")
+
+        # Buttons
+        button_font = QFont(option.font)
+        button_font.setPixelSize(16)
+        painter.setFont(button_font)
+        for (action, text, _), (_, rect) in zip(self.buttons, button_rects):
+            state = (entry.username, action)
+            if state == self._pressed:
+                color = self.BUTTON_PRESSED_COLOR
+            elif state == self._hovered:
+                color = self.BUTTON_HOVER_COLOR
+            else:
+                color = self.BUTTON_COLOR
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(color)
+            painter.drawRoundedRect(rect, 4, 4)
+            painter.setPen(self.BUTTON_TEXT_COLOR)
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        """
+        Track hover and press state of the buttons and emit button_clicked on release.
+        """
+        event_type = event.type()
+        if event_type not in (QEvent.Type.MouseMove, QEvent.Type.MouseButtonPress,
+                              QEvent.Type.MouseButtonRelease):
+            return super().editorEvent(event, model, option, index)
+
+        action = self._hit_test(option.rect, event.position().toPoint())
+        state = (index.data(Qt.ItemDataRole.DisplayRole), action) if action else None
+
+        if event_type == QEvent.Type.MouseMove:
+            if state != self._hovered:
+                self._hovered = state
+                self._update_view()
+            return False
+
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+
+        if event_type == QEvent.Type.MouseButtonPress:
+            self._pressed = state
+            self._update_view()
+            return state is not None
+
+        # Only count the click if it is released on the button of the user it started on
+        clicked = state is not None and state == self._pressed
+        self._pressed = None
+        self._update_view()
+        if clicked:
+            self.button_clicked.emit(action, state[0])
+        return clicked
+
+    def eventFilter(self, obj, event):
+        """
+        Clear the hover state when the cursor leaves the list or moves below the last row,
+        where editorEvent is not called.
+        """
+        if self._hovered is not None:
+            event_type = event.type()
+            if event_type == QEvent.Type.Leave or (
+                    event_type == QEvent.Type.MouseMove
+                    and not self.parent().indexAt(event.position().toPoint()).isValid()):
+                self._hovered = None
+                self._update_view()
+        return False
+
+    def helpEvent(self, event, view, option, index):
+        """
+        Show the tooltip of the button under the cursor.
+        """
+        action = self._hit_test(option.rect, event.pos())
+        tooltip = next((tip for name, _, tip in self.buttons if name == action), None)
+        if tooltip:
+            QToolTip.showText(event.globalPos(), tooltip, view)
+            return True
+        QToolTip.hideText()
+        return super().helpEvent(event, view, option, index)
+
+    def _button_rects(self, rect):
+        """
+        Return (action, QRect) pairs for the buttons of a row, right-aligned.
+        """
+        top = rect.top() + (rect.height() - self.BUTTON_SIZE) // 2
+        right = rect.right() - self.MARGIN
+        rects = []
+        for action, _, _ in reversed(self.buttons):
+            left = right - self.BUTTON_SIZE + 1
+            rects.append((action, QRect(left, top, self.BUTTON_SIZE, self.BUTTON_SIZE)))
+            right = left - self.BUTTON_SPACING - 1
+        rects.reverse()
+        return rects
+
+    def _hit_test(self, rect, pos):
+        """
+        Return the action of the button at pos, or None.
+        """
+        for action, button_rect in self._button_rects(rect):
+            if button_rect.contains(pos):
+                return action
+        return None
+
+    def _update_view(self):
+        view = self.parent()
+        if view is not None:
+            view.viewport().update()
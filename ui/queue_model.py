@@ -0,0 +1,74 @@
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class QueueListModel(QAbstractListModel):
+    """
+    List model exposing queue entries to a QListView.
+    The view only asks for the rows it currently shows, so large queues stay cheap to display.
+    """
+    # Role returning the QueueEntry of a row
+    EntryRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._entries):
+            return None
+
+        entry = self._entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry.username
+        if role == self.EntryRole:
+            return entry
+        return None
+
+    def insert_entry(self, row, entry):
+        """
+        Insert a single entry at the given row.
+        """
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._entries.insert(row, entry)
+        self.endInsertRows()
+
+    def remove_entry(self, row):
+        """
+        Remove the entry at the given row.
+        """
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._entries[row]
+        self.endRemoveRows()
+
+    def move_entry(self, from_row, to_row, entry):
+        """
+        Move an entry so it ends up at to_row and refresh its data.
+        """
+        # Qt expects the destination as a position in the list before the move
+        destination = to_row + 1 if to_row > from_row else to_row
+        self.beginMoveRows(QModelIndex(), from_row, from_row, QModelIndex(), destination)
+        del self._entries[from_row]
+        self._entries.insert(to_row, entry)
+        self.endMoveRows()
+        self.update_entry(to_row, entry)
+
+    def update_entry(self, row, entry):
+        """
+        Replace the entry at the given row and repaint it.
+        """
+        self._entries[row] = entry
+        model_index = self.index(row)
+        self.dataChanged.emit(model_index, model_index)
+
+    def set_entries(self, entries):
+        """
+        Replace all rows with the given entries.
+        """
+        self.beginResetModel()
+        self._entries = list(entries)
+        self.endResetModel()
@@ -0,0 +1,70 @@
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt6.QtCore import QTimer
+
+from bot.metrics import REGISTRY, Counter
+
+class StatsWindow(QDialog):
+    """
+    Shows the recorded metrics: count, average, estimated 99th percentile and maximum
+    of every timer, and the value of every counter. Refreshed once per second.
+    """
+    REFRESH_INTERVAL = 1000
+    COLUMNS = ["Metric", "Count", "Avg (ms)", "p99 (ms)", "Max (ms)"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Stats")
+        self.resize(700, 450)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+        self.setStyleSheet(self._get_styles())
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start(self.REFRESH_INTERVAL)
+        self.refresh()
+
+    def refresh(self):
+        """
+        Fill the table with the current values of all metrics.
+        """
+        rows = []
+        for metric in REGISTRY.metrics:
+            for labels, value in sorted(metric.snapshot().items()):
+                name = metric.name + (f" ({', '.join(labels)})" if labels else "")
+                if isinstance(metric, Counter):
+                    rows.append([name, str(value), "", "", ""])
+                else:
+                    count, total, maximum, p99 = value
+                    rows.append([name, str(count), f"{total / count * 1000:.3f}",
+                                 f"{p99 * 1000:.3f}", f"{maximum * 1000:.3f}"])
+
+        self.table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, text in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
+    def _get_styles(self):
+        """
+        Return the stats window stylesheet.
+        """
+        return """
+            QDialog, QTableWidget, QHeaderView::section {
+                background-color: #18181b;
+                color: #E9E9E9;
+                font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif;
+                font-size: 13px;
+            }
+            QTableWidget {
+                gridline-color: #3a3a3c;
+                border: none;
+            }
+        """
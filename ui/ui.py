@@ -1,29 +1,70 @@
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QListWidget, QPushButton, 
-    QHBoxLayout, QListWidgetItem, QGroupBox, QFrame, QSizePolicy,
+    QWidget, QVBoxLayout, QLabel, QListView, QPushButton,
+    QHBoxLayout, QGroupBox, QSizePolicy, QComboBox,
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPixmap, QColor, QPainter
-from .controller import QueueController
 
+from bot import metrics
 from ui.toggleButton import ToggleSwitch
 from ui.options_ui import OptionsWindow
+from ui.stats_ui import StatsWindow
+from ui.queue_model import QueueListModel
+from ui.queue_delegate import QueueItemDelegate
 
 class UI(QWidget):
-    def __init__(self, controller: QueueController, config):
+    def __init__(self, shards, config):
+        """
+        shards: ChannelShard per channel name, the main channel first.
+        The lists show one channel at a time, the channel can be switched when there are several.
+        """
         super().__init__()
         self.setWindowTitle("Queue Manager")
         self.setGeometry(100, 60, 1100, 700)
 
         self.config = config
-        self.controller = controller
-        self.controller.queue_updated.connect(self.refresh_queue)
-        self.controller.selected_updated.connect(self.refresh_selected)
-        self.controller.connection_status.connect(self.update_status_icon)
-        self.controller.status_message.connect(self.update_status_text)
+        self.shards = shards
+        self.controller = None
+
+        # The connection status is shown by the main channel's controller
+        main_controller = next(iter(shards.values())).controller
+        main_controller.connection_status.connect(self.update_status_icon)
+        main_controller.status_message.connect(self.update_status_text)
 
         self._setup_ui()
         self.setStyleSheet(self._get_styles())
+        self._models = {"queue": self.queue_model, "selected": self.selected_model}
+        self.show_channel(next(iter(shards)))
+
+    def show_channel(self, channel):
+        """
+        Show the queue of a channel and route the list buttons and the toggle to it.
+        """
+        if self.controller:
+            for signal, slot in self._controller_slots():
+                signal.disconnect(slot)
+        self.controller = self.shards[channel].controller
+        for signal, slot in self._controller_slots():
+            signal.connect(slot)
+
+        self.queue_toggle_button.setChecked(self.controller.queue_closed)
+        # The lists are replaced with full snapshots of the channel
+        self.controller.resync_ui()
+
+    def _controller_slots(self):
+        """
+        Returns the (signal, slot) pairs connecting the current controller to the lists.
+        """
+        return [
+            (self.controller.queue_updated, self.refresh_queue),
+            (self.controller.selected_updated, self.refresh_selected),
+            (self.controller.entry_inserted, self.on_entry_inserted),
+            (self.controller.entry_removed, self.on_entry_removed),
+            (self.controller.entry_moved, self.on_entry_moved),
+            (self.controller.entry_changed, self.on_entry_changed),
+            # Keep the toggle in sync when the queue is opened or closed through the control API
+            (self.controller.queue_closed_changed, self.queue_toggle_button.setChecked),
+        ]
 
     def _setup_ui(self):
         """
@@ -47,6 +88,14 @@ class UI(QWidget):
         # Set up the ui above the lists
         status_layout.addWidget(self.status_icon)
         status_layout.addWidget(self.status_label)
+
+        # Stats button, only when metrics are recorded
+        if metrics.is_enabled():
+            self.stats_button = QPushButton("📊")
+            self.stats_button.setToolTip("Stats")
+            self.stats_button.setFixedSize(40,40)
+            self.stats_button.clicked.connect(self.open_stats_window)
+            status_layout.addWidget(self.stats_button)
         status_layout.addWidget(self.options_button)
 
         # Toggle layout for closing the queue
@@ -56,16 +105,26 @@ class UI(QWidget):
         toggle_label.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
 
         # Create the toggle switch for closing the queue
-        queue_toggle_button = ToggleSwitch()
-        queue_toggle_button.toggled.connect(self.controller.set_queue_closed)
-        queue_toggle_button.setFixedSize(
-            queue_toggle_button.sizeHint().width() * 2,
-            queue_toggle_button.sizeHint().height()
+        self.queue_toggle_button = ToggleSwitch()
+        self.queue_toggle_button.toggled.connect(lambda closed: self.controller.set_queue_closed(closed))
+        self.queue_toggle_button.setFixedSize(
+            self.queue_toggle_button.sizeHint().width() * 2,
+            self.queue_toggle_button.sizeHint().height()
         )
         toggle_layout.addWidget(toggle_label)
-        toggle_layout.addWidget(queue_toggle_button)
+        toggle_layout.addWidget(self.queue_toggle_button)
         toggle_layout.addStretch()
 
+        # Channel selection, only needed when the bot runs in several channels
+        if len(self.shards) > 1:
+            channel_label = QLabel("Channel: ")
+            channel_label.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
+            self.channel_combo = QComboBox()
+            self.channel_combo.addItems(list(self.shards))
+            self.channel_combo.currentTextChanged.connect(self.show_channel)
+            toggle_layout.addWidget(channel_label)
+            toggle_layout.addWidget(self.channel_combo)
+
         # Main layout including status and the two lists (queue and selected)
         main_layout = QVBoxLayout()
         main_layout.addLayout(status_layout)
@@ -78,9 +137,15 @@ class UI(QWidget):
         self.queue_box.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.queue_box.setObjectName("queueBox")
         queue_layout = QVBoxLayout()
-        self.queue_list = QListWidget()
-        self.queue_list.setObjectName("queueList")
-        self.queue_list.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.queue_model = QueueListModel(self)
+        self.queue_list = self._create_list_view(self.queue_model, "queueList")
+        self.queue_delegate = QueueItemDelegate(
+            [("select", "⮞", "Move to selected")],
+            show_details=True,
+            parent=self.queue_list
+        )
+        self.queue_delegate.button_clicked.connect(self._on_list_button_clicked)
+        self.queue_list.setItemDelegate(self.queue_delegate)
         queue_layout.addWidget(self.queue_list)
         self.queue_box.setLayout(queue_layout)
 
@@ -89,9 +154,18 @@ class UI(QWidget):
         self.selected_box.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.selected_box.setObjectName("selectedBox")
         selected_layout = QVBoxLayout()
-        self.selected_list = QListWidget()
-        self.selected_list.setObjectName("selectedList")
-        self.selected_list.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.selected_model = QueueListModel(self)
+        self.selected_list = self._create_list_view(self.selected_model, "selectedList")
+        self.selected_delegate = QueueItemDelegate(
+            [
+                ("back", "⮜", "Move back to queue"),
+                ("remove", "X", "Remove from list without increasing queued counter"),
+                ("done", "✓", "Remove from list (increases queued count)"),
+            ],
+            parent=self.selected_list
+        )
+        self.selected_delegate.button_clicked.connect(self._on_list_button_clicked)
+        self.selected_list.setItemDelegate(self.selected_delegate)
         selected_layout.addWidget(self.selected_list)
         self.selected_box.setLayout(selected_layout)
 
@@ -101,52 +175,31 @@ class UI(QWidget):
         main_layout.addLayout(queue_selected_layout)
         self.setLayout(main_layout)
 
-    def add_to_list(self, list_widget, name, tier, games, move_callback):
+    def _create_list_view(self, model, object_name):
         """
-        Add a user item to the provided list widget with a move button.
-        For the selected list, also add two remove buttons.
+        Create a list view for the given model.
+        Rows are painted by a delegate, so only the visible rows cost anything.
         """
-        item_frame = QFrame()
-        item_layout = QHBoxLayout()
-        item_frame.setLayout(item_layout)
-        
-        name_label = QLabel(name)
-        name_label.setObjectName("nameLabel")
-        name_label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-        item_layout.addWidget(name_label)
-
-        if list_widget == self.queue_list:
-            details_label = QLabel(f"Tier {tier} | Queued: {games}")
-            details_label.setObjectName("detailsLabel")
-            item_layout.addWidget(details_label)
-
-        move_button = QPushButton("⮞" if list_widget == self.queue_list else "⮜")
-        move_button.setObjectName("moveButton")
-        move_button.setToolTip("Move to selected" if list_widget == self.queue_list else "Move back to queue")
-        move_button.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed)
-        move_button.clicked.connect(lambda: move_callback(name))
-        item_layout.addWidget(move_button)
-
-        # For selected list items, add two remove buttons.
-        if list_widget == self.selected_list:
-            # Remove without incrementing count
-            remove_no_count_button = QPushButton("X")
-            remove_no_count_button.setToolTip("Remove from list without increasing queued counter")
-            remove_no_count_button.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed)
-            remove_no_count_button.clicked.connect(lambda: self.remove_from_selected_without_count(name))
-            item_layout.addWidget(remove_no_count_button)
-
-            # Remove and increase queued counter
-            remove_button = QPushButton("✓")
-            remove_button.setToolTip("Remove from list (increases queued count)")
-            remove_button.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed)
-            remove_button.clicked.connect(lambda: self.remove_from_selected(name))
-            item_layout.addWidget(remove_button)
-
-        list_item = QListWidgetItem()
-        list_item.setSizeHint(item_frame.sizeHint())
-        list_widget.addItem(list_item)
-        list_widget.setItemWidget(list_item, item_frame)
+        list_view = QListView()
+        list_view.setObjectName(object_name)
+        list_view.setModel(model)
+        list_view.setUniformItemSizes(True)
+        list_view.setMouseTracking(True)
+        list_view.setSelectionMode(QListView.SelectionMode.NoSelection)
+        list_view.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        return list_view
+
+    def _on_list_button_clicked(self, action, name):
+        """
+        Dispatch a button click of a list row to the matching action.
+        """
+        actions = {
+            "select": self.move_to_selected,
+            "back": self.move_back_to_queue,
+            "remove": self.remove_from_selected_without_count,
+            "done": self.remove_from_selected,
+        }
+        actions[action](name)
 
     def update_status_icon(self, connected: bool):
         """
@@ -166,21 +219,41 @@ class UI(QWidget):
         self.status_icon.setPixmap(pixmap)
         self.status_label.setText(text)
 
-    def refresh_queue(self):
+    def refresh_queue(self, queue):
+        """
+        Replace the rows of the queue list with the given queue.
+        """
+        self.queue_model.set_entries(queue)
+
+    def refresh_selected(self, selected):
+        """
+        Replace the rows of the selected list with the given selected list.
+        """
+        self.selected_model.set_entries(selected)
+
+    def on_entry_inserted(self, target, index, entry):
         """
-        Clear and repopulate the queue list widget.
+        Insert a single row into the queue or selected list.
         """
-        self.queue_list.clear()
-        for name, tier, games, _ in self.controller.queue_manager.get_queue():
-            self.add_to_list(self.queue_list, name, tier, games, self.move_to_selected)
+        self._models[target].insert_entry(index, entry)
 
-    def refresh_selected(self):
+    def on_entry_removed(self, target, index):
         """
-        Clear and repopulate the selected list widget.
+        Remove a single row from the queue or selected list.
         """
-        self.selected_list.clear()
-        for name, tier, games, _ in self.controller.queue_manager.get_selected():
-            self.add_to_list(self.selected_list, name, tier, games, self.move_back_to_queue)
+        self._models[target].remove_entry(index)
+
+    def on_entry_moved(self, target, from_index, to_index, entry):
+        """
+        Move a single row inside the queue or selected list.
+        """
+        self._models[target].move_entry(from_index, to_index, entry)
+
+    def on_entry_changed(self, target, index, entry):
+        """
+        Repaint a single row of the queue or selected list.
+        """
+        self._models[target].update_entry(index, entry)
 
     def move_to_selected(self, name):
         """
@@ -221,6 +294,10 @@ class UI(QWidget):
         self.options_window = OptionsWindow(self.config, self.controller)
         self.options_window.show()
 
+    def open_stats_window(self):
+        self.stats_window = StatsWindow()
+        self.stats_window.show()
+
     def _get_styles(self):
         """
         Return the UI stylesheet.
@@ -247,7 +324,7 @@ class UI(QWidget):
                 font-weight: bold;
                 color: #E9E9E9; 
             }
-            QListWidget {
+            QListView {
                 background: #40444b; 
                 border-radius: 6px;
                 padding: 10px;
@@ -255,19 +332,6 @@ class UI(QWidget):
                 color: #E9E9E9; 
                 border: none;
             }
-            QFrame#queueItem, QFrame#selectedItem {
-                border-radius: 6px;
-                border: 1px solid #3a3a3c; 
-            }
-            QLabel#nameLabel {
-                font-weight: bold;
-                color: #FFFFFF; 
-            }
-            QLabel#detailsLabel {
-                color: #939393;
-                font-size: 14px;
-                text-align: right;
-            }
             QPushButton {
                 background: #5865f2;
                 height: 40px;
@@ -277,9 +341,6 @@ class UI(QWidget):
                 border-radius: 4px;
                 font-size: 16px;
             }
-            QPushButton#mooveButton{
-                margin-left: 15px;
-            }
             QPushButton:hover {
                 background: #4752c4;
             }